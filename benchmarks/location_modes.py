@@ -0,0 +1,35 @@
+# Benchmark of the facility location linking formulations on generated instances.
+# Usage: python -m benchmarks.location_modes [--sizes 200x20 1000x50] [--k-nearest 10]
+import argparse
+import time
+import gurobipy as gp
+from optim.generators import location_instance
+from optim.location import FORMULATIONS, solve_facility_location
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the facility location formulations.")
+    parser.add_argument('--sizes', nargs='+', default=['200x20', '1000x50', '2000x100'],
+                        help="instance sizes as CUSTOMERSxFACILITIES")
+    parser.add_argument('--k-nearest', type=int, default=None, help="prune arcs to the k nearest facilities")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-limit', type=float, default=600.0)
+    args = parser.parse_args()
+
+    env = gp.Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.setParam('TimeLimit', args.time_limit)
+    env.start()
+
+    print(f"{'instance':>12} {'formulation':>14} {'cost':>14} {'seconds':>9}")
+    for size in args.sizes:
+        num_customers, num_facilities = map(int, size.split('x'))
+        instance = location_instance(num_customers, num_facilities, seed=args.seed)
+        for formulation in FORMULATIONS:
+            start = time.perf_counter()
+            result = solve_facility_location(**instance, env=env, k_nearest=args.k_nearest, formulation=formulation)
+            elapsed = time.perf_counter() - start
+            cost = f"{result['cost']:.4f}" if result else 'not solved'
+            print(f"{size:>12} {formulation:>14} {cost:>14} {elapsed:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Parity check of the solver backends: solves generated production and location instances
+# with every backend, plus (with Gurobi) the FactoryPlanningModel and dict builders the pages
+# use, prints objectives and times, and exits non-zero when the objectives of a case
+# disagree beyond the tolerance.
+# Usage: python -m benchmarks.parity [--backends gurobi highs] [--seeds 0 1 2] [--tolerance 1e-4]
+import argparse
+import sys
+import time
+from optim.backends import BACKENDS
+from optim.generators import factory_instance, location_instance
+from optim.location import solve_facility_location
+from optim.production import FactoryPlanningModel, solve_factory_planning, solve_factory_planning_backend
+
+# Function to turn a generated (array) production instance into the name-keyed dicts the
+# page widgets produce, which is what the dict builder takes
+def _named(user_input):
+    months, products = user_input['months'], user_input['products']
+    resources, materials = user_input['resources'], user_input['raw_materials']
+    vector = lambda values, keys: dict(zip(keys, values.tolist()))
+    nested = lambda values, rows: {row: vector(value, products) for row, value in zip(rows, values)}
+    flat = lambda values, rows, cols: {(row, col): values[i, j] for i, row in enumerate(rows) for j, col in enumerate(cols)}
+    return {
+        **user_input,
+        'profit': vector(user_input['profit'], products),
+        'max_sales': flat(user_input['max_sales'], months, products),
+        'resource_cost': vector(user_input['resource_cost'], resources),
+        'time_req': nested(user_input['time_req'], resources),
+        'down': flat(user_input['down'], months, resources),
+        'installed': vector(user_input['installed'], resources),
+        'raw_material_availability': vector(user_input['raw_material_availability'], materials),
+        'raw_material_cost': vector(user_input['raw_material_cost'], materials),
+        'material_usage': nested(user_input['material_usage'], materials),
+    }
+
+# Generated cases as (name, {solver: solve function taking an env}, result key); every
+# backend is a solver, and with Gurobi so are the builders that bypass the backends. The
+# default sizes stay within the limits of the restricted Gurobi license.
+def _cases(seeds, backends):
+    for seed in seeds:
+        for products, months in ((10, 6), (50, 12)):
+            user_input = factory_instance(products, months, seed=seed)
+            solvers = {backend: lambda env, backend=backend, user_input=user_input:
+                       solve_factory_planning_backend(user_input, backend, env=env) for backend in backends}
+            if 'gurobi' in backends:
+                solvers['gurobi model'] = lambda env, user_input=user_input: FactoryPlanningModel(user_input).solve()
+                solvers['gurobi dict'] = lambda env, named=_named(user_input): solve_factory_planning(named)
+            yield f"production {products}x{months} s{seed}", solvers, 'profit'
+        for customers, facilities in ((50, 10), (120, 15)):
+            instance = location_instance(customers, facilities, seed=seed)
+            for formulation in ('disaggregated', 'aggregated'):
+                solvers = {backend: lambda env, backend=backend, instance=instance, formulation=formulation:
+                           solve_facility_location(**instance, env=env, formulation=formulation, backend=backend)
+                           for backend in backends}
+                yield f"location {customers}x{facilities} {formulation[:4]} s{seed}", solvers, 'cost'
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the solver backends agree.")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0, 1, 2])
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help="allowed relative objective difference (the default MIP gap)")
+    args = parser.parse_args()
+
+    env = None
+    if 'gurobi' in args.backends:
+        import gurobipy as gp
+        env = gp.Env(empty=True)
+        env.setParam('OutputFlag', 0)
+        env.start()
+        # The builders the pages use run in the default environment
+        gp.setParam('OutputFlag', 0)
+
+    print(f"{'case':>32} {'solver':>14} {'objective':>14} {'s':>7} {'rel. diff':>10}")
+    mismatches = 0
+    for name, solvers, key in _cases(args.seeds, args.backends):
+        reference = None
+        for solver, solve in solvers.items():
+            start = time.perf_counter()
+            result = solve(env)
+            elapsed = time.perf_counter() - start
+            objective = result[key] if result else None
+            # Differences are relative to the first solver of the case
+            if reference is None:
+                reference = objective
+            if objective is None or reference is None:
+                difference = float('inf')
+            else:
+                difference = abs(objective - reference) / max(1.0, abs(reference))
+            mismatches += difference > args.tolerance
+            print(f"{name:>32} {solver:>14} {objective if objective is not None else float('nan'):>14.4f} "
+                  f"{elapsed:>7.3f} {difference:>10.2e}")
+
+    if mismatches:
+        print(f"{mismatches} solve(s) disagree", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# Benchmark of rolling-horizon factory planning against the monolithic model on generated
+# long-horizon instances. Every run happens in a fresh process so its peak RSS is its own.
+# Usage: python -m benchmarks.rolling_horizon [--sizes 100x104 500x104] [--windows 12x6 26x13]
+#        [--backend highs]
+import argparse
+import multiprocessing
+import resource
+import time
+
+# Function run in a child process: one solve, reported through the queue
+def _run(products, months, window, step, backend, queue):
+    from optim.generators import factory_instance
+    from optim.production import solve_factory_planning_backend, solve_factory_planning_rolling
+    instance = factory_instance(products, months, num_resources=12, num_materials=6)
+    start = time.perf_counter()
+    if window is None:
+        result = solve_factory_planning_backend(instance, backend)
+    else:
+        result = solve_factory_planning_rolling(instance, window, step, backend=backend)
+    queue.put((result and result['profit'], time.perf_counter() - start,
+               resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rolling-horizon and full factory planning.")
+    parser.add_argument('--sizes', nargs='+', default=['100x104', '500x104', '1000x104'],
+                        help="instance sizes as PRODUCTSxMONTHS")
+    parser.add_argument('--windows', nargs='+', default=['12x6', '26x13'], help="rolling windows as WINDOWxSTEP")
+    parser.add_argument('--backend', default='highs', choices=('gurobi', 'highs'))
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'instance':>10} {'mode':>8} {'profit':>16} {'gap':>8} {'seconds':>8} {'peak MB':>8}")
+    for size in args.sizes:
+        products, months = map(int, size.split('x'))
+        full = None
+        for mode in ['full', *args.windows]:
+            window, step = (None, None) if mode == 'full' else map(int, mode.split('x'))
+            queue = context.Queue()
+            process = context.Process(target=_run, args=(products, months, window, step, args.backend, queue))
+            process.start()
+            profit, seconds, peak = queue.get()
+            process.join()
+            if mode == 'full':
+                full = profit
+            gap = f"{100 * (full - profit) / abs(full):.3f}%" if full and profit is not None else '-'
+            shown = 'not solved' if profit is None else f"{profit:.1f}"
+            print(f"{size:>10} {mode:>8} {shown:>16} {gap:>8} {seconds:>8.2f} {peak:>8.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# Reproducible benchmark of both models over size tiers of seeded synthetic instances.
+# Every case runs in a fresh process so its peak RSS is its own. Results go to a JSON file
+# that can later be passed back with --baseline to flag regressions.
+#
+# Usage: python -m benchmarks.run [--tiers small medium] [--out bench.json] [--baseline old.json]
+# The small tier fits Gurobi's size-limited license; cases that fail (e.g. on model size)
+# are recorded with their error instead of stopping the run.
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+# Generator arguments of every case, per size tier
+TIERS = {
+    'small': {
+        'production': {'num_products': 10, 'num_months': 12, 'num_resources': 3, 'num_materials': 3},
+        'location_uniform': {'num_customers': 40, 'num_facilities': 15},
+        'location_clustered': {'num_customers': 40, 'num_facilities': 15, 'clusters': 4},
+    },
+    'medium': {
+        'production': {'num_products': 100, 'num_months': 52, 'num_resources': 12, 'num_materials': 6},
+        'location_uniform': {'num_customers': 500, 'num_facilities': 50},
+        'location_clustered': {'num_customers': 500, 'num_facilities': 50, 'clusters': 8},
+    },
+    'large': {
+        'production': {'num_products': 500, 'num_months': 104, 'num_resources': 30, 'num_materials': 12},
+        'location_uniform': {'num_customers': 5000, 'num_facilities': 200},
+        'location_clustered': {'num_customers': 5000, 'num_facilities': 200, 'clusters': 20},
+    },
+}
+# Metrics compared against a baseline; higher is worse for all of them
+TRACKED = ('build_s', 'solve_s', 'extract_s', 'peak_rss_mb')
+
+def _model_size(model):
+    return {'rows': model.NumConstrs, 'cols': model.NumVars, 'nnz': model.NumNZs}
+
+def _production_case(params, seed):
+    from optim.generators import factory_instance
+    from optim.production import FactoryPlanningModel
+    instance = factory_instance(**params, seed=seed)
+    start = time.perf_counter()
+    model = FactoryPlanningModel(instance)
+    model.factory.update()
+    built = time.perf_counter()
+    model.factory.optimize()
+    solved = time.perf_counter()
+    result = model.result()
+    extracted = time.perf_counter()
+    return model.factory, built - start, solved - built, extracted - solved, result and result['profit']
+
+def _location_case(params, seed):
+    from optim.generators import location_instance
+    from optim.location import build_location_model, extract_location_solution
+    instance = location_instance(**params, seed=seed)
+    start = time.perf_counter()
+    m, select, assign, arcs = build_location_model(**instance)
+    m.update()
+    built = time.perf_counter()
+    m.optimize()
+    solved = time.perf_counter()
+    result = extract_location_solution(m, select, assign, arcs)
+    extracted = time.perf_counter()
+    return m, built - start, solved - built, extracted - solved, result and result['cost']
+
+# Function run in a child process: one case, reported through the queue
+def _run_case(kind, params, seed, threads, queue):
+    import gurobipy as gp
+    try:
+        gp.setParam('OutputFlag', 0)
+        if threads is not None:
+            gp.setParam('Threads', threads)
+        case = _production_case if kind == 'production' else _location_case
+        model, build, solve, extract, objective = case(params, seed)
+        record = {'build_s': build, 'solve_s': solve, 'extract_s': extract, 'objective': objective,
+                  **_model_size(model)}
+    except Exception as error:
+        record = {'error': f"{type(error).__name__}: {error}"}
+    # ru_maxrss is in kilobytes on Linux
+    record['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put(record)
+
+def run(tiers, seed=0, threads=None):
+    context = multiprocessing.get_context('spawn')
+    records = []
+    for tier in tiers:
+        for case, params in TIERS[tier].items():
+            kind = 'production' if case == 'production' else 'location'
+            queue = context.Queue()
+            process = context.Process(target=_run_case, args=(kind, params, seed, threads, queue))
+            process.start()
+            record = queue.get()
+            process.join()
+            records.append({'tier': tier, 'case': case, 'params': params, **record})
+            if 'error' in record:
+                summary = record['error']
+            else:
+                summary = (f"build {record['build_s']:8.3f}s  solve {record['solve_s']:8.3f}s  "
+                           f"extract {record['extract_s']:8.3f}s  objective {record['objective']}")
+            print(f"{tier:>7} {case:>19}  rss {record['peak_rss_mb']:8.1f}MB  {summary}", flush=True)
+    return records
+
+# Function to list tracked metrics that got worse than the baseline by more than `tolerance`
+def regressions(records, baseline, tolerance):
+    previous = {(record['tier'], record['case']): record for record in baseline['records']}
+    found = []
+    for record in records:
+        old = previous.get((record['tier'], record['case']))
+        if old is None or 'error' in record or 'error' in old:
+            continue
+        for metric in TRACKED:
+            # Ignore sub-10ms timings, which are mostly noise
+            if old[metric] > 0.01 and record[metric] > old[metric] * (1 + tolerance):
+                found.append(f"{record['tier']}/{record['case']} {metric}: {old[metric]:.3f} -> {record[metric]:.3f}")
+        if old.get('objective') is not None and record.get('objective') is not None \
+                and abs(old['objective'] - record['objective']) > 1e-6 * max(1.0, abs(old['objective'])):
+            found.append(f"{record['tier']}/{record['case']} objective: {old['objective']} -> {record['objective']}")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the factory planning and facility location models.")
+    parser.add_argument('--tiers', nargs='+', choices=list(TIERS), default=['small'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, help="Gurobi Threads parameter")
+    parser.add_argument('--out', default='bench_output.json')
+    parser.add_argument('--baseline', help="earlier output to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    import gurobipy as gp
+    records = run(args.tiers, args.seed, args.threads)
+    with open(args.out, 'w') as out:
+        json.dump({
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'gurobi': '.'.join(map(str, gp.gurobi.version())),
+            'machine': platform.machine(),
+            'cpus': multiprocessing.cpu_count(),
+            'seed': args.seed,
+            'records': records,
+        }, out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            found = regressions(records, json.load(baseline), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# Optimization models behind the Streamlit pages, importable without any UI code
@@ -0,0 +1,222 @@
+# Headless entry point: python -m optim {production,location} INSTANCE --out RESULT
+#
+# INSTANCE is either a JSON file (the same fields the pages pass to the solvers; nested
+# {month: {product: value}} dicts stand in for tuple-keyed ones), a directory of CSV/Parquet
+# tables in the layout described in optim/io.py, or an instance saved by `python -m optim pack`
+# (see optim/instance.py), which is memory-mapped instead of parsed. RESULT ending in .json
+# gets one JSON document; anything else is a directory that receives one Parquet file per
+# result table.
+# Solver modules are imported per command and no UI library is ever loaded.
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Function to read the raw instance: a saved Instance, a dict from JSON, or the tables of a directory
+def _load(path):
+    from optim.instance import Instance, is_instance_path
+    path = Path(path)
+    if is_instance_path(path):
+        return Instance.load(path), None
+    if path.is_dir():
+        from optim.io import read_tables
+        return None, read_tables({file.name: file.read_bytes() for file in sorted(path.iterdir())
+                                  if file.suffix.lower() in ('.csv', '.parquet', '.pq')})
+    return json.loads(path.read_text()), None
+
+# Function to write the result tables either as one JSON document or as Parquet files
+def _write(out, summary, tables):
+    out = Path(out)
+    if out.suffix.lower() == '.json':
+        document = dict(summary)
+        for name, table in tables.items():
+            document[name] = json.loads(table.to_json(orient='split'))
+        out.write_text(json.dumps(document, indent=2))
+    else:
+        out.mkdir(parents=True, exist_ok=True)
+        for name, table in tables.items():
+            table.to_parquet(out / f"{name}.parquet")
+        (out / 'summary.json').write_text(json.dumps(summary, indent=2))
+
+# Function to solve through the persistent solution cache when --cache is given. `solve`
+# takes the latest cached result whose `family` data matches, for use as a MIP start.
+def _cached(args, solve, kind, instance, family=None, **options):
+    if args.cache is None:
+        return solve(None)
+    from optim.cache import SolutionCache, cached_solve, instance_hash
+    cache = SolutionCache(args.cache, max_bytes=args.cache_size * 2 ** 20)
+    family = None if family is None else instance_hash(f'{kind}-family', family)
+    result, hit = cached_solve(cache, instance_hash(kind, instance, **options), solve, family=family,
+                               telemetry=args.telemetry)
+    if hit:
+        print("Result served from the solution cache.", file=sys.stderr)
+    return result
+
+_SETTINGS = ('holding_cost', 'max_inventory', 'store_target', 'hours_per_month')
+
+# Function to load a production instance as a validated Instance; settings given on the
+# command line override those of the instance
+def _production_input(args):
+    from optim.instance import Instance
+    user_input, tables = _load(args.instance)
+    if tables is not None:
+        from optim.io import production_instance
+        user_input = production_instance(tables)
+    elif not isinstance(user_input, Instance):
+        user_input = Instance.from_dict('production', user_input)
+    settings = {key: getattr(args, key, None) for key in _SETTINGS}
+    return user_input.replace(**{key: value for key, value in settings.items() if value is not None})
+
+def _solve_production(args):
+    from optim.production import solve_factory_planning
+    user_input = _production_input(args)
+    for key in _SETTINGS:
+        if key not in user_input:
+            raise SystemExit(f"error: {key} is neither in the instance nor given with --{key.replace('_', '-')}")
+    if args.telemetry:
+        args.telemetry.mark('load')
+
+    if args.window:
+        from optim.production import rolling_horizon_gap, solve_factory_planning_rolling
+        solve = lambda previous: solve_factory_planning_rolling(user_input, args.window, args.step, backend=args.backend,
+                                                                telemetry=args.telemetry)
+        result = _cached(args, solve, 'production', user_input, window=args.window, step=args.step)
+    else:
+        solve = lambda previous: solve_factory_planning(user_input, vectorized=True, telemetry=args.telemetry,
+                                                        backend=args.backend)
+        result = _cached(args, solve, 'production', user_input)
+    if result is None:
+        return None
+    summary = {'profit': result['profit']}
+    if args.window and args.report_gap:
+        summary['rolling_horizon_gap'] = rolling_horizon_gap(user_input, args.window, args.step, backend=args.backend,
+                                                             rolling=result)
+    plans = ('make_plan', 'sell_plan', 'store_plan', 'raw_material_plan')
+    return summary, {name: result[name] for name in plans}
+
+def _solve_location(args):
+    import pandas as pd
+    instance, tables = _load(args.instance)
+    if tables is not None:
+        from optim.io import location_instance
+        instance = location_instance(tables)
+    # --cost-per-mile overrides the instance's value, which defaults to 1
+    cost_per_mile = args.cost_per_mile if args.cost_per_mile is not None else instance.get('cost_per_mile', 1.0)
+    if args.capacitated:
+        for key in ('demand', 'capacity'):
+            if key not in instance:
+                raise SystemExit(f"error: --capacitated needs {key} in the instance")
+    if args.telemetry:
+        args.telemetry.mark('load')
+    common = dict(k_nearest=args.k_nearest, threads=args.threads, telemetry=args.telemetry)
+    if args.backend != 'gurobi' and (args.capacitated or args.formulation == 'benders'):
+        raise SystemExit("error: --capacitated and --formulation benders need --backend gurobi")
+    if args.capacitated:
+        from optim.capacitated import solve_capacitated_location
+        solve = lambda previous: solve_capacitated_location(
+            instance['customers'], instance['facilities'], instance['setup_cost'], cost_per_mile,
+            instance['demand'], instance['capacity'], **common
+        )
+        kind, fields = 'capacitated', ('customers', 'facilities', 'setup_cost', 'demand', 'capacity')
+    else:
+        from optim.location import solve_facility_location
+        solve = lambda previous: solve_facility_location(
+            instance['customers'], instance['facilities'], instance['setup_cost'], cost_per_mile,
+            formulation=args.formulation, backend=args.backend, start=previous and previous['build'], **common
+        )
+        kind, fields = 'location', ('customers', 'facilities', 'setup_cost')
+    # A result for the same candidate sites is a MIP start for the uncapacitated model
+    result = _cached(args, solve, kind, {field: instance[field] for field in fields},
+                     family=instance['facilities'], cost_per_mile=cost_per_mile, k_nearest=args.k_nearest)
+    if result is None:
+        return None
+
+    # Multi-period results are flattened with a period column
+    build, shipments = result['build'], result['shipments']
+    periods = build if build and isinstance(build[0], list) else None
+    if periods is None:
+        build, shipments = [build], [shipments]
+    summary = {key: value for key, value in result.items() if key not in ('build', 'shipments')}
+    return summary, {
+        'build': pd.DataFrame([(t, f) for t, facilities in enumerate(build) for f in facilities],
+                              columns=['period', 'facility']),
+        'shipments': pd.DataFrame([(t, *shipment) for t, period in enumerate(shipments) for shipment in period],
+                                  columns=['period', 'customer', 'facility', 'fraction']),
+    }
+
+# Function to convert an instance (JSON or tables) into a saved Instance
+def _pack(args):
+    if args.kind == 'production':
+        instance = _production_input(args)
+    else:
+        from optim.instance import Instance
+        instance, tables = _load(args.instance)
+        if tables is not None:
+            from optim.io import location_instance
+            instance = location_instance(tables)
+        elif not isinstance(instance, Instance):
+            instance = Instance.from_dict('location', instance)
+    instance.save(args.out)
+    print(f"Saved {args.kind} instance ({instance.nbytes / 2 ** 20:.1f} MB of arrays) to {args.out}", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m optim', description="Solve an optimization instance headlessly.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    production = commands.add_parser('production', help="factory planning")
+    production.add_argument('--window', type=int, help="solve by rolling horizon with windows of this many months")
+    production.add_argument('--step', type=int, help="months committed per window (default: half the window)")
+    production.add_argument('--report-gap', action='store_true',
+                            help="also solve the full model and report the rolling-horizon gap")
+    production.set_defaults(solve=_solve_production)
+
+    location = commands.add_parser('location', help="facility location")
+    location.add_argument('--cost-per-mile', type=float, help="overrides the instance's value (default 1)")
+    location.add_argument('--formulation', default='disaggregated',
+                          choices=('disaggregated', 'aggregated', 'benders'))
+    location.add_argument('--k-nearest', type=int)
+    location.add_argument('--capacitated', action='store_true', help="use the demand and capacity columns")
+    location.add_argument('--threads', type=int)
+    location.set_defaults(solve=_solve_location)
+
+    pack = commands.add_parser('pack', help="save an instance in the compact, memory-mappable format")
+    pack.add_argument('kind', choices=('production', 'location'))
+
+    # Production settings, overriding those of the instance; packing stores them with it
+    for command in (production, pack):
+        command.add_argument('--holding-cost', type=float)
+        command.add_argument('--max-inventory', type=float)
+        command.add_argument('--store-target', type=float)
+        command.add_argument('--hours-per-month', type=float)
+
+    for command in (production, location):
+        command.add_argument('instance', help="JSON file, directory of CSV/Parquet tables or packed instance")
+        command.add_argument('--out', required=True, help="result .json file or output directory for Parquet files")
+        command.add_argument('--telemetry', metavar='FILE', help="write phase timings and solver progress as JSON lines")
+        command.add_argument('--cache', metavar='FILE',
+                             help="SQLite solution cache; repeated instances are answered from it")
+        command.add_argument('--cache-size', type=float, default=256, help="cache size limit in MB (default 256)")
+        command.add_argument('--backend', default='gurobi', choices=('gurobi', 'highs'), help="solver engine")
+
+    pack.add_argument('instance', help="JSON file or directory of CSV/Parquet tables")
+    pack.add_argument('--out', required=True, help="output .npz or .arrow file, or a directory of .npy files")
+
+    args = parser.parse_args(argv)
+    if args.command == 'pack':
+        return _pack(args)
+    telemetry_file = args.telemetry
+    if telemetry_file:
+        from optim.telemetry import Telemetry
+        args.telemetry = Telemetry()
+    solved = args.solve(args)
+    if telemetry_file:
+        Path(telemetry_file).write_text(args.telemetry.to_json_lines() + '\n')
+    if solved is None:
+        print("No optimal solution found.", file=sys.stderr)
+        return 1
+    _write(args.out, *solved)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
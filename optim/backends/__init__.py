@@ -0,0 +1,53 @@
+import numpy as np
+import scipy.sparse as sp
+
+# Solver-agnostic model layer. A model is described once as sparse arrays (MatrixProblem)
+# and handed to a backend:
+#   'gurobi'  gurobipy (commercial, license-limited)
+#   'highs'   HiGHS through highspy (open source, no license limit on parallel processes)
+# Backends are imported on first use, so highspy is only needed when it is selected.
+BACKENDS = ('gurobi', 'highs')
+
+# Model in the form  min/max c @ x  s.t.  row_lower <= A @ x <= row_upper,  lb <= x <= ub,
+# with x[integer] integral. `start` optionally holds a (partial) MIP start, NaN where unset.
+class MatrixProblem:
+    def __init__(self, c, A, row_lower, row_upper, lb=None, ub=None, integer=None, maximize=False, name='problem',
+                 start=None):
+        n = len(c)
+        self.c = np.asarray(c, dtype=float)
+        self.A = sp.csr_matrix(A)
+        self.row_lower = np.asarray(row_lower, dtype=float)
+        self.row_upper = np.asarray(row_upper, dtype=float)
+        self.lb = np.zeros(n) if lb is None else np.broadcast_to(np.asarray(lb, dtype=float), (n,))
+        self.ub = np.full(n, np.inf) if ub is None else np.broadcast_to(np.asarray(ub, dtype=float), (n,))
+        self.integer = np.zeros(n, dtype=bool) if integer is None else np.asarray(integer, dtype=bool)
+        self.maximize = maximize
+        self.name = name
+        self.start = None if start is None else np.asarray(start, dtype=float)
+        if self.A.shape != (len(self.row_lower), n) or len(self.row_upper) != len(self.row_lower):
+            raise ValueError(f"Inconsistent shapes: A is {self.A.shape}, {len(self.row_lower)} row bounds, {n} columns")
+
+    @property
+    def shape(self):
+        return self.A.shape
+
+# Function to stack constraint blocks given as (A, row_lower, row_upper) into one problem matrix
+def stack_rows(blocks):
+    return (
+        sp.vstack([block[0] for block in blocks], format='csr'),
+        np.concatenate([np.broadcast_to(block[1], (block[0].shape[0],)) for block in blocks]),
+        np.concatenate([np.broadcast_to(block[2], (block[0].shape[0],)) for block in blocks]),
+    )
+
+# Function to solve a MatrixProblem with the named backend. Returns (objective, x, optimal):
+# optimal is True for a proven optimum and False for the incumbent of a MIP stopped by its
+# time limit or by cancellation; None when there is neither. A Telemetry records solver
+# progress and stops the solve once telemetry.cancelled() turns true.
+def solve_problem(problem, backend='gurobi', threads=None, time_limit=None, env=None, telemetry=None):
+    if backend == 'gurobi':
+        from optim.backends.gurobi import solve
+        return solve(problem, threads=threads, time_limit=time_limit, env=env, telemetry=telemetry)
+    if backend == 'highs':
+        from optim.backends.highs import solve
+        return solve(problem, threads=threads, time_limit=time_limit, telemetry=telemetry)
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
@@ -0,0 +1,32 @@
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+from optim.telemetry import Telemetry
+
+# Function to solve a MatrixProblem with Gurobi's matrix API; ranged rows become two rows
+def solve(problem, threads=None, time_limit=None, env=None, telemetry=None):
+    m = gp.Model(problem.name, env=env)
+    m.ModelSense = GRB.MAXIMIZE if problem.maximize else GRB.MINIMIZE
+    if threads is not None:
+        m.Params.Threads = threads
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+
+    vtype = np.where(problem.integer, GRB.INTEGER, GRB.CONTINUOUS)
+    x = m.addMVar(len(problem.c), lb=problem.lb, ub=problem.ub, obj=problem.c, vtype=vtype, name='x')
+    if problem.start is not None:
+        x.Start = np.where(np.isnan(problem.start), GRB.UNDEFINED, problem.start)
+
+    lower, upper = problem.row_lower, problem.row_upper
+    equal = lower == upper
+    has_lower = np.isfinite(lower) & ~equal
+    has_upper = np.isfinite(upper) & ~equal
+    for rows, sense, rhs in ((equal, '=', lower), (has_lower, '>', lower), (has_upper, '<', upper)):
+        if rows.any():
+            m.addMConstr(problem.A[rows], x, sense, rhs[rows])
+    m.optimize(telemetry.callback if isinstance(telemetry, Telemetry) else None)
+
+    stopped = problem.integer.any() and m.status in (GRB.TIME_LIMIT, GRB.INTERRUPTED) and m.SolCount > 0
+    if m.status != GRB.OPTIMAL and not stopped:
+        return None
+    return m.objVal, x.X, m.status == GRB.OPTIMAL
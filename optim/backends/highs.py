@@ -0,0 +1,71 @@
+import numpy as np
+import scipy.sparse as sp
+import highspy
+from optim.telemetry import Telemetry
+
+_MIP_INTERRUPT = int(highspy.cb.HighsCallbackType.kCallbackMipInterrupt)
+_MIP_SOLUTION = int(highspy.cb.HighsCallbackType.kCallbackMipImprovingSolution)
+# Points at which HiGHS polls user_interrupt, one per algorithm
+_INTERRUPTS = (highspy.cb.HighsCallbackType.kCallbackSimplexInterrupt,
+               highspy.cb.HighsCallbackType.kCallbackIpmInterrupt,
+               highspy.cb.HighsCallbackType.kCallbackMipInterrupt)
+
+# Function to make the HiGHS callback for a Telemetry: MIP progress and new incumbents are
+# recorded like the Gurobi callback does, and the run is interrupted once it is cancelled
+def _callback(telemetry):
+    def callback(kind, message, data_out, data_in, user_data):
+        if kind == _MIP_SOLUTION:
+            telemetry.record_mip(data_out.running_time, 'solution', data_out.mip_primal_bound,
+                                 data_out.mip_dual_bound, data_out.mip_node_count,
+                                 solution=data_out.objective_function_value)
+        elif kind == _MIP_INTERRUPT and telemetry.due(data_out.running_time):
+            telemetry.record_mip(data_out.running_time, 'mip', data_out.mip_primal_bound, data_out.mip_dual_bound,
+                                 data_out.mip_node_count)
+        if telemetry.cancelled():
+            data_in.user_interrupt = True
+    return callback
+
+# Function to solve a MatrixProblem with HiGHS
+def solve(problem, threads=None, time_limit=None, telemetry=None):
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+    if threads is not None:
+        h.setOptionValue('threads', threads)
+    if time_limit is not None:
+        h.setOptionValue('time_limit', float(time_limit))
+
+    num_rows, num_cols = problem.shape
+    A = sp.csc_matrix(problem.A)
+    lp = highspy.HighsLp()
+    lp.num_col_ = num_cols
+    lp.num_row_ = num_rows
+    lp.col_cost_ = problem.c
+    lp.col_lower_ = np.asarray(problem.lb, dtype=float)
+    lp.col_upper_ = np.asarray(problem.ub, dtype=float)
+    lp.row_lower_ = problem.row_lower
+    lp.row_upper_ = problem.row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    lp.sense_ = highspy.ObjSense.kMaximize if problem.maximize else highspy.ObjSense.kMinimize
+    if problem.integer.any():
+        lp.integrality_ = [highspy.HighsVarType.kInteger if integer else highspy.HighsVarType.kContinuous
+                           for integer in problem.integer]
+    h.passModel(lp)
+    if problem.start is not None:
+        given = np.flatnonzero(~np.isnan(problem.start))
+        h.setSolution(len(given), given, problem.start[given])
+    if isinstance(telemetry, Telemetry):
+        h.setCallback(_callback(telemetry), None)
+        for kind in (*_INTERRUPTS, highspy.cb.HighsCallbackType.kCallbackMipImprovingSolution):
+            h.startCallback(kind)
+    h.run()
+
+    status = h.getModelStatus()
+    stopped = (problem.integer.any() and status in (highspy.HighsModelStatus.kTimeLimit, highspy.HighsModelStatus.kInterrupt)
+               and h.getInfo().primal_solution_status == 2)
+    if status != highspy.HighsModelStatus.kOptimal and not stopped:
+        return None
+    return (h.getInfo().objective_function_value, np.array(h.getSolution().col_value),
+            status == highspy.HighsModelStatus.kOptimal)
@@ -0,0 +1,55 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from optim.location import solve_facility_location
+from optim.production import solve_factory_planning_backend
+
+# Solver settings of the current worker process
+_env = None
+_backend = None
+_threads = None
+
+# Function run once in every worker. Gurobi workers start a private, quiet environment with
+# their own thread budget; other backends receive the thread budget with every solve.
+def _init_worker(backend, threads):
+    global _env, _backend, _threads
+    _backend, _threads = backend, threads
+    if backend == 'gurobi':
+        import gurobipy as gp
+        _env = gp.Env(empty=True)
+        _env.setParam('OutputFlag', 0)
+        _env.setParam('Threads', threads)
+        _env.start()
+
+def _solve_location(key, instance):
+    return key, solve_facility_location(**instance, env=_env, threads=_threads, backend=_backend)
+
+def _solve_production(key, user_input):
+    return key, solve_factory_planning_backend(user_input, _backend, threads=_threads, env=_env)
+
+# Function to fan instances out over worker processes, yielding (key, result) as each finishes
+def _run_batch(solve, instances, workers, threads_per_worker, backend):
+    items = instances.items() if isinstance(instances, dict) else enumerate(instances)
+    if workers is None:
+        workers = max(1, len(os.sched_getaffinity(0)) // threads_per_worker)
+
+    # Spawned workers do not inherit the parent's solver state
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(backend, threads_per_worker)) as pool:
+        futures = [pool.submit(solve, key, instance) for key, instance in items]
+        for future in as_completed(futures):
+            yield future.result()
+
+# Function to solve many facility location instances in parallel. `instances` is a dict
+# (or a list, keyed by position) of keyword arguments for solve_facility_location.
+# Yields (key, result) pairs as soon as each instance finishes. Each worker runs
+# `threads_per_worker` solver threads, and by default the pool uses as many workers as
+# fit in the available cores, so the machine is not oversubscribed.
+def solve_location_batch(instances, workers=None, threads_per_worker=1, backend='gurobi'):
+    return _run_batch(_solve_location, instances, workers, threads_per_worker, backend)
+
+# Function to solve many factory planning instances (user_input dicts) in parallel, like
+# solve_location_batch. HiGHS is the default so the number of workers is not license-bound.
+def solve_production_batch(instances, workers=None, threads_per_worker=1, backend='highs'):
+    return _run_batch(_solve_production, instances, workers, threads_per_worker, backend)
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import struct
+import time
+from collections.abc import Mapping
+from contextlib import closing
+from pathlib import Path
+import numpy as np
+import scipy.sparse as sp
+from optim.telemetry import NO_TELEMETRY
+
+# Persistent solution cache shared by all sessions and processes on a machine. Results are
+# keyed by a canonical hash of the instance (see instance_hash) and stored in one SQLite
+# file; the least recently used entries are evicted once the stored results exceed
+# max_bytes. Entries also carry a family hash (e.g. the candidate sites of a location
+# instance) so a stored solution of a similar instance can be used as a MIP start.
+DEFAULT_PATH = Path(os.environ.get('OPTIM_CACHE_DIR', Path.home() / '.cache' / 'optim')) / 'solutions.sqlite'
+
+# Function to encode a value canonically: mappings (dicts or Instances) are order-independent,
+# every number is a float64 (so 1 and 1.0 agree, -0.0 becomes 0.0) and lists, tuples, numeric
+# arrays and sparse matrices of the same shape and values encode alike
+def _encode(value):
+    if sp.issparse(value):
+        value = value.toarray()
+    if isinstance(value, Mapping):
+        pairs = sorted(_encode(key) + _encode(item) for key, item in value.items())
+        tag, payload = b'd', b''.join(pairs)
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        array = np.asarray(value) if len(value) else np.zeros(0)
+        if array.dtype.kind in 'biuf':
+            array = np.ascontiguousarray(array, dtype=np.float64) + 0.0
+            tag, payload = b'a', struct.pack(f'<{array.ndim + 1}q', array.ndim, *array.shape) + array.tobytes()
+        else:
+            tag, payload = b'l', b''.join(_encode(item) for item in value)
+    elif isinstance(value, (bool, np.bool_)) or value is None:
+        tag, payload = b'v', repr(value).encode()
+    elif isinstance(value, (int, float, np.number)):
+        tag, payload = b'f', struct.pack('<d', float(value) + 0.0)
+    elif isinstance(value, str):
+        tag, payload = b's', value.encode()
+    else:
+        raise TypeError(f"Cannot hash a value of type {type(value).__name__}")
+    return tag + struct.pack('<q', len(payload)) + payload
+
+# Function to hash an instance (any nesting of dicts, lists, arrays, numbers and strings)
+# together with the options that change its solution
+def instance_hash(kind, instance, **options):
+    return hashlib.sha256(_encode({'kind': kind, 'instance': instance, 'options': options})).hexdigest()
+
+class SolutionCache:
+    def __init__(self, path=None, max_bytes=256 * 2 ** 20):
+        self.path = Path(path or DEFAULT_PATH)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con, con:
+            con.execute('CREATE TABLE IF NOT EXISTS solutions ('
+                        'key TEXT PRIMARY KEY, family TEXT, result BLOB, size INTEGER, used REAL)')
+            con.execute('CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used)')
+            con.execute('CREATE INDEX IF NOT EXISTS solutions_family ON solutions (family, used)')
+
+    # Connections are opened per call so one cache object can be shared between threads
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # Function to return the stored result for `key` (marking it as recently used) or None
+    def get(self, key):
+        with closing(self._connect()) as con, con:
+            row = con.execute('SELECT result FROM solutions WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            con.execute('UPDATE solutions SET used = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    # Function to return the most recently used result of a family, or None
+    def latest(self, family):
+        with closing(self._connect()) as con:
+            row = con.execute('SELECT result FROM solutions WHERE family = ? ORDER BY used DESC LIMIT 1',
+                              (family,)).fetchone()
+        return None if row is None else pickle.loads(row[0])
+
+    # Function to store a result and evict least recently used entries beyond max_bytes
+    def put(self, key, result, family=None):
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with closing(self._connect()) as con, con:
+            con.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)',
+                        (key, family, blob, len(blob), time.time()))
+            total = con.execute('SELECT COALESCE(SUM(size), 0) FROM solutions').fetchone()[0]
+            if total > self.max_bytes:
+                evict = []
+                for old_key, size in con.execute('SELECT key, size FROM solutions ORDER BY used'):
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((old_key,))
+                    total -= size
+                con.executemany('DELETE FROM solutions WHERE key = ?', evict)
+
+    def stats(self):
+        with closing(self._connect()) as con:
+            entries, size = con.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions').fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        with closing(self._connect()) as con, con:
+            con.execute('DELETE FROM solutions')
+
+# Function to return the cached result for `key` or solve and store it. `solve` receives the
+# latest stored result of `family` (or None) to warm-start from. Returns (result, hit).
+def cached_solve(cache, key, solve, family=None, telemetry=None):
+    telemetry = telemetry or NO_TELEMETRY
+    result = cache.get(key)
+    telemetry.mark('cache')
+    if result is not None:
+        return result, True
+    result = solve(cache.latest(family) if family is not None else None)
+    if result is not None:
+        cache.put(key, result, family)
+    return result, False
@@ -0,0 +1,248 @@
+import numpy as np
+import scipy.sparse as sp
+from optim.location import candidate_arcs
+from optim.telemetry import NO_TELEMETRY
+
+# Capacitated, optionally multi-period facility location on the same inputs as the
+# uncapacitated model (customers, facilities, setup_cost, cost_per_mile) plus a demand per
+# customer and a capacity per facility. With a (periods x customers) demand, facilities can
+# be opened and closed between periods and the setup cost is paid every time one opens.
+# Shipping costs are per unit of demand moved.
+
+# Function to greedily assign customers (largest regret first) to their cheapest built
+# facilities with capacity left, splitting demand when needed. Arcs are customer-major with
+# the same number per customer. Returns the fraction shipped per arc and the customers whose
+# demand could not be fully served (the fractions are only a plan when there are none).
+def _greedy_assignment(is_open, demand, capacity, arc_facility, arc_cost):
+    num_customers = len(demand)
+    cost = np.where(is_open[arc_facility], arc_cost, np.inf).reshape(num_customers, -1)
+    ranked = np.argsort(cost, axis=1)
+    ordered_cost = np.take_along_axis(cost, ranked, axis=1)
+    if ordered_cost.shape[1] > 1:
+        with np.errstate(invalid='ignore'):
+            regret = ordered_cost[:, 1] - ordered_cost[:, 0]
+        regret[~np.isfinite(regret)] = np.inf
+    else:
+        regret = np.zeros(num_customers)
+
+    remaining = np.where(is_open, capacity, 0.0)
+    fraction = np.zeros(len(arc_cost))
+    arcs_per_customer = cost.shape[1]
+    unserved = []
+    for c in np.argsort(-regret, kind='stable'):
+        if not np.isfinite(ordered_cost[c, 0]):
+            unserved.append(c)
+            continue
+        if demand[c] <= 0:
+            fraction[c * arcs_per_customer + ranked[c, 0]] = 1.0
+            continue
+        need = demand[c]
+        for rank in range(arcs_per_customer):
+            if need <= 1e-9 * demand[c] or not np.isfinite(ordered_cost[c, rank]):
+                break
+            a = c * arcs_per_customer + ranked[c, rank]
+            take = min(need, remaining[arc_facility[a]])
+            if take > 0:
+                fraction[a] = take / demand[c]
+                remaining[arc_facility[a]] -= take
+                need -= take
+        if need > 1e-9 * demand[c]:
+            unserved.append(c)
+    return fraction, np.array(unserved, dtype=int)
+
+# Function to evaluate one facility's Lagrangian subproblem: a continuous knapsack that ships
+# the arcs with negative reduced cost, cheapest per unit of demand first, up to capacity
+def _facility_knapsack(reduced, weight, capacity):
+    chosen = np.flatnonzero(reduced < 0)
+    if len(chosen) == 0:
+        return 0.0, chosen, np.zeros(0)
+    per_unit = reduced[chosen] / np.maximum(weight[chosen], 1e-12)
+    chosen = chosen[np.argsort(per_unit)]
+    load = np.cumsum(weight[chosen])
+    taken = np.clip((capacity - (load - weight[chosen])) / np.maximum(weight[chosen], 1e-12), 0.0, 1.0)
+    return float(reduced[chosen] @ taken), chosen, taken
+
+# Function to run a subgradient Lagrangian heuristic for one period, relaxing the demand
+# constraints. Returns (lower bound, best open set or None, its shipped fractions, its cost).
+def lagrangian_heuristic(demand, capacity, fixed_cost, arc_customer, arc_facility, arc_cost, iterations=100):
+    num_customers, num_facilities = len(demand), len(capacity)
+    weight = demand[arc_customer]
+    shipping = weight * arc_cost
+    facility_arcs = [np.flatnonzero(arc_facility == f) for f in range(num_facilities)]
+
+    best_bound, best_open, best_fraction, best_cost = -np.inf, None, None, np.inf
+
+    # Function to repair an open set to enough capacity, assign greedily and drop unused
+    # facilities. Customers the assignment cannot serve (with pruned arcs, capacity may be
+    # open but out of their reach) get their cheapest closed candidate opened, then it retries.
+    arcs_per_customer = len(arc_cost) // max(num_customers, 1)
+    def primal(is_open):
+        is_open = is_open.copy()
+        for f in np.argsort(fixed_cost / np.maximum(capacity, 1e-12)):
+            if capacity[is_open].sum() >= demand.sum():
+                break
+            is_open[f] = True
+        while True:
+            fraction, unserved = _greedy_assignment(is_open, demand, capacity, arc_facility, arc_cost)
+            if len(unserved) == 0:
+                break
+            arcs = unserved[:, np.newaxis] * arcs_per_customer + np.arange(arcs_per_customer)
+            candidate = arc_facility[arcs]
+            opening_cost = np.where(is_open[candidate], np.inf, fixed_cost[candidate] + shipping[arcs])
+            reachable = np.isfinite(opening_cost).any(axis=1)
+            if not reachable.any():
+                return None, None, np.inf
+            is_open[candidate[reachable, np.argmin(opening_cost[reachable], axis=1)]] = True
+        is_open = np.bincount(arc_facility, weights=fraction, minlength=num_facilities) > 0
+        return is_open, fraction, float(fixed_cost[is_open].sum() + shipping @ fraction)
+
+    # Start from the cheapest arc per customer and from all facilities open
+    multipliers = np.minimum.reduceat(shipping, np.searchsorted(arc_customer, np.arange(num_customers)))
+    best_open, best_fraction, best_cost = primal(np.ones(num_facilities, dtype=bool))
+    step_scale, stalled = 2.0, 0
+    for iteration in range(iterations):
+        reduced = shipping - multipliers[arc_customer]
+        bound = multipliers.sum()
+        shipped = np.zeros(num_customers)
+        is_open = np.zeros(num_facilities, dtype=bool)
+        for f, arcs in enumerate(facility_arcs):
+            value, chosen, taken = _facility_knapsack(reduced[arcs], weight[arcs], capacity[f])
+            if fixed_cost[f] + value < 0:
+                bound += fixed_cost[f] + value
+                is_open[f] = True
+                np.add.at(shipped, arc_customer[arcs[chosen]], taken)
+
+        if bound > best_bound + 1e-9 * abs(best_bound if np.isfinite(best_bound) else 1.0):
+            best_bound, stalled = bound, 0
+        else:
+            stalled += 1
+            if stalled >= 5:
+                step_scale, stalled = step_scale / 2, 0
+
+        if iteration % 10 == 0 or iteration == iterations - 1:
+            candidate_open, fraction, cost = primal(is_open)
+            if cost < best_cost:
+                best_open, best_fraction, best_cost = candidate_open, fraction, cost
+
+        subgradient = 1.0 - shipped
+        norm = subgradient @ subgradient
+        # Without a feasible plan yet there is no gap to close
+        closed = np.isfinite(best_cost) and best_cost - best_bound <= 1e-9 * abs(best_cost)
+        if norm < 1e-12 or step_scale < 1e-4 or closed:
+            break
+        target = best_cost if np.isfinite(best_cost) else bound + abs(bound) + 1.0
+        multipliers = multipliers + step_scale * (target - bound) / norm * subgradient
+
+    return best_bound, best_open, best_fraction, best_cost
+
+# Function to solve the capacitated (multi-period when demand is 2-D) facility location model.
+# The Lagrangian heuristic seeds a MIP start and a lower bound; when the two are already within
+# mip_gap the MIP is skipped. Returns None when nothing feasible is found, otherwise a dict with
+# the cost, the lower bound and, per period, the facilities to operate ('build') and the
+# shipments as (customer, facility, fraction of demand); single-period inputs get flat lists.
+def solve_capacitated_location(customers, facilities, setup_cost, cost_per_mile, demand, capacity, env=None,
+                               threads=None, k_nearest=None, mip_gap=1e-4, time_limit=None, iterations=100,
+                               telemetry=None):
+    telemetry = telemetry or NO_TELEMETRY
+    demand = np.asarray(demand, dtype=float)
+    multi_period = demand.ndim == 2
+    demand = demand.reshape(-1, len(customers))
+    setup_cost = np.asarray(setup_cost, dtype=float)
+    capacity = np.asarray(capacity, dtype=float)
+    num_periods, num_customers = demand.shape
+    num_facilities = len(capacity)
+    arc_customer, arc_facility, arc_cost = candidate_arcs(customers, facilities, cost_per_mile, k_nearest)
+    num_arcs = len(arc_cost)
+
+    # Heuristic per period. Spreading the setup cost over the periods keeps the summed
+    # Lagrangian bounds valid, since a facility used in any period pays its setup at least once.
+    lower_bound, start_open, start_fraction = 0.0, [], []
+    for t in range(num_periods):
+        bound, is_open, fraction, _ = lagrangian_heuristic(
+            demand[t], capacity, setup_cost / num_periods, arc_customer, arc_facility, arc_cost, iterations
+        )
+        lower_bound += bound
+        start_open.append(is_open)
+        start_fraction.append(fraction)
+    has_start = all(is_open is not None for is_open in start_open)
+    if has_start:
+        operate_start = np.array(start_open, dtype=float)
+        opened_start = np.clip(operate_start - np.vstack([np.zeros(num_facilities), operate_start[:-1]]), 0, 1)
+        fraction_start = np.concatenate(start_fraction)
+        shipping = (demand[:, arc_customer] * arc_cost).ravel()
+        heuristic_cost = float(setup_cost @ opened_start.sum(axis=0) + shipping @ fraction_start)
+    else:
+        heuristic_cost = np.inf
+    telemetry.mark('heuristic')
+
+    def result(cost, bound, operate, fraction, optimal):
+        build = [np.flatnonzero(operate[t] > 0.5).tolist() for t in range(num_periods)]
+        shipments = []
+        for t in range(num_periods):
+            block = fraction[t * num_arcs:(t + 1) * num_arcs]
+            used = np.flatnonzero(block > 1e-6)
+            shipments.append(list(zip(arc_customer[used].tolist(), arc_facility[used].tolist(), block[used].tolist())))
+        return {
+            'cost': cost,
+            'optimal': optimal,
+            'lower_bound': bound,
+            'heuristic_cost': heuristic_cost,
+            'build': build if multi_period else build[0],
+            'shipments': shipments if multi_period else shipments[0],
+        }
+
+    # Optimal within mip_gap, as the MIP below would be
+    if has_start and heuristic_cost - lower_bound <= mip_gap * abs(heuristic_cost):
+        return result(heuristic_cost, lower_bound, operate_start, fraction_start, True)
+
+    # MIP model, laid out period-major
+    import gurobipy as gp
+    from gurobipy import GRB
+    m = gp.Model('capacitated_facility_location', env=env)
+    m.ModelSense = GRB.MINIMIZE
+    m.Params.MIPGap = mip_gap
+    if threads is not None:
+        m.Params.Threads = threads
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+
+    operate = m.addMVar(num_periods * num_facilities, vtype=GRB.BINARY, name='Operate')
+    opened = m.addMVar(num_periods * num_facilities, ub=1, obj=np.tile(setup_cost, num_periods), name='Open')
+    assign = m.addMVar(num_periods * num_arcs, ub=1, obj=(demand[:, arc_customer] * arc_cost).ravel(), name='Assign')
+
+    # Opening: a facility operating in t but not in t - 1 pays its setup cost
+    previous = sp.kron(sp.eye(num_periods, k=-1), sp.eye(num_facilities), format='csr')
+    m.addConstr(opened - operate + previous @ operate >= np.zeros(num_periods * num_facilities), name='Opening')
+    # Demand: every customer is fully served in every period
+    arc_index = np.arange(num_arcs)
+    customer_arcs = sp.csr_matrix((np.ones(num_arcs), (arc_customer, arc_index)), shape=(num_customers, num_arcs))
+    m.addConstr(sp.kron(sp.eye(num_periods), customer_arcs, format='csr') @ assign == np.ones(num_periods * num_customers),
+                name='Demand')
+    # Capacity: shipped demand stays within the capacity of operating facilities
+    facility_load = sp.block_diag([
+        sp.csr_matrix((demand[t, arc_customer], (arc_facility, arc_index)), shape=(num_facilities, num_arcs))
+        for t in range(num_periods)
+    ], format='csr')
+    m.addConstr(facility_load @ assign - sp.diags(np.tile(capacity, num_periods)) @ operate
+                <= np.zeros(num_periods * num_facilities), name='Capacity')
+    # Setup2ship: strong linking that tightens the LP relaxation
+    arc_to_facility = sp.csr_matrix((np.ones(num_arcs), (arc_index, arc_facility)), shape=(num_arcs, num_facilities))
+    m.addConstr(assign - sp.kron(sp.eye(num_periods), arc_to_facility, format='csr') @ operate
+                <= np.zeros(num_periods * num_arcs), name='Setup2ship')
+
+    if has_start:
+        operate.Start = operate_start.ravel()
+        opened.Start = opened_start.ravel()
+        assign.Start = fraction_start
+    telemetry.mark('build')
+    m.optimize(telemetry.callback)
+    telemetry.mark('optimize')
+
+    if m.SolCount == 0:
+        if has_start:
+            return result(heuristic_cost, lower_bound, operate_start, fraction_start, False)
+        return None
+    solution = result(m.objVal, max(lower_bound, m.ObjBound), operate.X.reshape(num_periods, num_facilities), assign.X,
+                      m.status == GRB.OPTIMAL)
+    telemetry.mark('extract')
+    return solution
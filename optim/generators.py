@@ -0,0 +1,51 @@
+import numpy as np
+
+# Seeded instance generators for benchmarking. The same arguments always give the same instance.
+
+# Function to generate a random facility location instance on a square of side `size`.
+# Customers are spread uniformly, or around `clusters` random centres when clusters is set.
+# Setup costs are drawn so that a handful of facilities is typically worth building.
+def location_instance(num_customers, num_facilities, seed=0, size=100.0, cost_per_mile=1.0, clusters=None):
+    rng = np.random.default_rng(seed)
+    if clusters:
+        centres = rng.uniform(0, size, (clusters, 2))
+        customers = centres[rng.integers(0, clusters, num_customers)] + rng.normal(0, 0.05 * size, (num_customers, 2))
+        customers = np.clip(customers, 0, size)
+    else:
+        customers = rng.uniform(0, size, (num_customers, 2))
+    return {
+        'customers': customers,
+        'facilities': rng.uniform(0, size, (num_facilities, 2)),
+        'setup_cost': rng.uniform(0.5, 1.5, num_facilities) * size * num_customers / 10,
+        'cost_per_mile': cost_per_mile,
+    }
+
+# Function to generate a feasible factory planning instance in the array form the matrix builder
+# takes. Every product uses about 60% of the resources; installed machines cover roughly 80% of
+# peak demand and raw materials about 60% of total demand, so both constraint families bind.
+def factory_instance(num_products, num_months, num_resources=3, num_materials=3, seed=0, hours_per_month=160.0):
+    rng = np.random.default_rng(seed)
+    max_sales = rng.integers(0, 200, (num_months, num_products)).astype(float)
+    time_req = rng.uniform(0.1, 1.0, (num_resources, num_products)) * (rng.random((num_resources, num_products)) < 0.6)
+    material_usage = rng.uniform(0.0, 2.0, (num_materials, num_products))
+    installed = np.ceil(0.8 * time_req @ max_sales.max(axis=0) / hours_per_month) + 1
+    down = (rng.random((num_months, num_resources)) < 0.1).astype(float)
+    return {
+        'months': [f"Month {i + 1}" for i in range(num_months)],
+        'products': [f"Product {i + 1}" for i in range(num_products)],
+        'resources': [f"Resource {i + 1}" for i in range(num_resources)],
+        'raw_materials': [f"Material {i + 1}" for i in range(num_materials)],
+        'profit': rng.uniform(5.0, 20.0, num_products),
+        'max_sales': max_sales,
+        'resource_cost': rng.uniform(0.0, 1.0, num_resources),
+        'time_req': time_req,
+        'down': down,
+        'installed': installed,
+        'raw_material_availability': 0.6 * material_usage @ max_sales.sum(axis=0),
+        'raw_material_cost': rng.uniform(0.0, 0.5, num_materials),
+        'material_usage': material_usage,
+        'holding_cost': 0.5,
+        'max_inventory': 100.0,
+        'store_target': 10.0,
+        'hours_per_month': hours_per_month,
+    }
@@ -0,0 +1,308 @@
+import json
+from collections.abc import Mapping
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import scipy.sparse as sp
+
+# Typed, memory-compact instances. An Instance keeps every parameter as a float64 array
+# indexed by position (dense, or CSR when mostly zero) and the names of each axis in
+# separate lists, so no lookup hashes a name. It is validated once, when it is built or
+# loaded, and reads like the array-form dict instances (instance['max_sales'],
+# instance['months']), so every solver accepts it unchanged; solve_factory_planning hands it
+# to the matrix builder, as the dict builder needs name-keyed dicts. Its instance_hash is
+# that of the array-form dict, not that of the name-keyed dicts the pages build. Instances
+# are saved as
+#   DIR/         one .npy file per array plus instance.json; memory-mapped on load
+#   FILE.npz     one compressed file; read into memory on load
+#   FILE.arrow   an Arrow IPC file; memory-mapped on load
+# A memory-mapped instance pickles as its path, so worker processes map the same file
+# read-only instead of receiving a copy of the arrays.
+
+# Fields of each kind: the name axes, every array with its axes (an int is a fixed length),
+# arrays that may be left out, arrays stored as CSR when mostly zero, arrays that must not
+# be negative and the scalar settings
+SCHEMAS = {
+    'production': {
+        'axes': ('months', 'products', 'resources', 'raw_materials'),
+        'arrays': {
+            'profit': ('products',),
+            'max_sales': ('months', 'products'),
+            'resource_cost': ('resources',),
+            'time_req': ('resources', 'products'),
+            'down': ('months', 'resources'),
+            'installed': ('resources',),
+            'raw_material_availability': ('raw_materials',),
+            'raw_material_cost': ('raw_materials',),
+            'material_usage': ('raw_materials', 'products'),
+        },
+        'optional': (),
+        'sparse': ('max_sales', 'time_req', 'down', 'material_usage'),
+        'nonnegative': ('profit', 'max_sales', 'resource_cost', 'time_req', 'down', 'installed',
+                        'raw_material_availability', 'raw_material_cost', 'material_usage'),
+        'scalars': ('holding_cost', 'max_inventory', 'store_target', 'hours_per_month'),
+    },
+    'location': {
+        'axes': ('customer_names', 'facility_names'),
+        'arrays': {
+            'customers': ('customer_names', 2),
+            'facilities': ('facility_names', 2),
+            'setup_cost': ('facility_names',),
+            'demand': ('customer_names',),
+            'capacity': ('facility_names',),
+        },
+        'optional': ('demand', 'capacity'),
+        'sparse': (),
+        'nonnegative': ('setup_cost', 'demand', 'capacity'),
+        'scalars': ('cost_per_mile',),
+    },
+}
+# Arrays with at most this share of nonzeros are stored as CSR
+SPARSE_DENSITY = 0.5
+_META_FILE = 'instance.json'
+_ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+# Function to turn a name-keyed input (or an array) into a float vector ordered by keys
+def as_vector(values, keys):
+    if isinstance(values, dict):
+        return np.array([values.get(key, 0) for key in keys], dtype=float)
+    return np.asarray(values, dtype=float).reshape(len(keys))
+
+# Function to turn a nested {row: {col: v}} or flat {(row, col): v} input, an array or a
+# sparse matrix into a dense matrix
+def as_matrix(values, rows, cols):
+    if sp.issparse(values):
+        return values.toarray().reshape(len(rows), len(cols))
+    if not isinstance(values, dict):
+        return np.asarray(values, dtype=float).reshape(len(rows), len(cols))
+    if any(isinstance(value, dict) for value in values.values()):
+        return np.array([[values.get(row, {}).get(col, 0) for col in cols] for row in rows], dtype=float)
+    return np.array([[values.get((row, col), 0) for col in cols] for row in rows], dtype=float)
+
+# Function to store a matrix as CSR when few of its entries are nonzero
+def _compact(matrix):
+    if matrix.size and np.count_nonzero(matrix) <= SPARSE_DENSITY * matrix.size:
+        return sp.csr_matrix(matrix)
+    return matrix
+
+# Function to reopen a memory-mapped instance in another process (see Instance.__reduce__)
+def _reopen(path, scalars):
+    instance = Instance.load(path, validate=False)
+    instance.scalars = dict(scalars)
+    return instance
+
+class Instance(Mapping):
+    def __init__(self, kind, names, arrays, scalars=None, validate=True):
+        if kind not in SCHEMAS:
+            raise ValueError(f"Unknown instance kind {kind!r}; expected one of {tuple(SCHEMAS)}")
+        schema = SCHEMAS[kind]
+        self.kind = kind
+        self.names = {axis: list(names[axis]) for axis in schema['axes']}
+        self.arrays = {field: arrays[field] for field in schema['arrays'] if field in arrays}
+        self.scalars = {key: float(value) for key, value in (scalars or {}).items() if value is not None}
+        # Set when the arrays are mapped from a file
+        self.path = None
+        self._index = {}
+        if validate:
+            self.validate()
+
+    # Function to build an instance from the name-keyed fields the pages pass to the solvers
+    # (nested or tuple-keyed dicts, lists or arrays), compacting mostly-zero matrices to CSR
+    @classmethod
+    def from_dict(cls, kind, data, validate=True):
+        if kind not in SCHEMAS:
+            raise ValueError(f"Unknown instance kind {kind!r}; expected one of {tuple(SCHEMAS)}")
+        schema = SCHEMAS[kind]
+        unknown = set(data) - set(schema['axes']) - set(schema['arrays']) - set(schema['scalars'])
+        if unknown:
+            raise ValueError(f"Unknown {kind} instance fields {sorted(unknown)}")
+        missing = [axis for axis in schema['axes'] if axis not in data]
+        if missing:
+            raise ValueError(f"Missing {kind} instance fields {missing}")
+        names = {axis: [str(name) for name in data[axis]] for axis in schema['axes']}
+        arrays = {}
+        for field, axes in schema['arrays'].items():
+            if field not in data:
+                continue
+            keys = [data[axis] if isinstance(axis, str) else range(axis) for axis in axes]
+            try:
+                value = as_vector(data[field], *keys) if len(axes) == 1 else as_matrix(data[field], *keys)
+            except ValueError:
+                raise ValueError(f"Field '{field}' does not match the lengths of {axes}") from None
+            arrays[field] = _compact(value) if field in schema['sparse'] else value
+        scalars = {key: data[key] for key in schema['scalars'] if key in data}
+        return cls(kind, names, arrays, scalars, validate)
+
+    # Function to check every field once: unique names, array shapes against the name axes,
+    # float64 values that are finite (and not negative where the schema says so)
+    def validate(self):
+        schema = SCHEMAS[self.kind]
+        for axis, names in self.names.items():
+            if len(set(names)) != len(names):
+                raise ValueError(f"Duplicate names in '{axis}'")
+        for field in schema['arrays']:
+            if field in self.arrays:
+                self._check(field, self.arrays[field])
+            elif field not in schema['optional']:
+                raise ValueError(f"Missing array '{field}'")
+        for key, value in self.scalars.items():
+            if key not in schema['scalars']:
+                raise ValueError(f"Unknown {self.kind} setting '{key}'")
+            if not np.isfinite(value):
+                raise ValueError(f"Setting '{key}' is not finite")
+
+    def _check(self, field, value):
+        schema = SCHEMAS[self.kind]
+        shape = tuple(len(self.names[axis]) if isinstance(axis, str) else axis for axis in schema['arrays'][field])
+        if value.shape != shape:
+            raise ValueError(f"Array '{field}' has shape {value.shape}, expected {shape}")
+        if sp.issparse(value):
+            value.check_format(full_check=True)
+            value = value.data
+        if value.dtype != np.float64:
+            raise ValueError(f"Array '{field}' has dtype {value.dtype}, expected float64")
+        if not np.isfinite(value).all():
+            raise ValueError(f"Array '{field}' has values that are not finite")
+        if field in schema['nonnegative'] and (value < 0).any():
+            raise ValueError(f"Array '{field}' has negative values")
+
+    def __getitem__(self, key):
+        if key in self.names:
+            return self.names[key]
+        if key in self.arrays:
+            return self.arrays[key]
+        return self.scalars[key]
+
+    def __iter__(self):
+        yield from self.names
+        yield from self.arrays
+        yield from self.scalars
+
+    def __len__(self):
+        return len(self.names) + len(self.arrays) + len(self.scalars)
+
+    # Function to return the position of a name on an axis; the map is built on first use
+    def index(self, axis, name):
+        if axis not in self._index:
+            self._index[axis] = {value: position for position, value in enumerate(self.names[axis])}
+        return self._index[axis][name]
+
+    # Function to return a copy with some arrays or settings replaced; the other arrays are
+    # shared, and only the replaced fields are validated
+    def replace(self, **values):
+        schema = SCHEMAS[self.kind]
+        instance = Instance(self.kind, self.names, self.arrays, self.scalars, validate=False)
+        for key, value in values.items():
+            if key in schema['scalars']:
+                instance.scalars[key] = float(value)
+                if not np.isfinite(instance.scalars[key]):
+                    raise ValueError(f"Setting '{key}' is not finite")
+            elif key in schema['arrays']:
+                axes = schema['arrays'][key]
+                keys = [self.names[axis] if isinstance(axis, str) else range(axis) for axis in axes]
+                value = as_vector(value, *keys) if len(axes) == 1 else as_matrix(value, *keys)
+                instance.arrays[key] = _compact(value) if key in schema['sparse'] else value
+                instance._check(key, instance.arrays[key])
+            else:
+                raise ValueError(f"Unknown {self.kind} instance field '{key}'")
+        if all(key in schema['scalars'] for key in values):
+            instance.path = self.path
+        return instance
+
+    # Bytes held by the arrays (CSR counts its data and index arrays)
+    @property
+    def nbytes(self):
+        return sum(value.data.nbytes + value.indices.nbytes + value.indptr.nbytes if sp.issparse(value)
+                   else value.nbytes for value in self.arrays.values())
+
+    # A mapped instance travels to other processes as its path, anything else as its arrays
+    def __reduce__(self):
+        if self.path is not None:
+            return _reopen, (str(self.path), self.scalars)
+        return Instance, (self.kind, self.names, self.arrays, self.scalars, False)
+
+    # Function to flatten the instance into named 1-D or 2-D arrays plus a JSON description
+    def _columns(self):
+        columns = {f'names.{axis}': np.array(names, dtype=str) for axis, names in self.names.items()}
+        shapes = {}
+        for field, value in self.arrays.items():
+            shapes[field] = value.shape
+            if sp.issparse(value):
+                columns[f'{field}.data'], columns[f'{field}.indices'], columns[f'{field}.indptr'] = (
+                    value.data, value.indices, value.indptr
+                )
+            else:
+                columns[field] = np.ascontiguousarray(value)
+        meta = {'kind': self.kind, 'scalars': self.scalars, 'shapes': shapes,
+                'sparse': [field for field, value in self.arrays.items() if sp.issparse(value)]}
+        return columns, meta
+
+    # Function to rebuild an instance from the output of _columns
+    @classmethod
+    def _from_columns(cls, columns, meta, validate):
+        schema = SCHEMAS[meta['kind']]
+        names = {axis: columns[f'names.{axis}'].tolist() for axis in schema['axes']}
+        arrays = {}
+        for field, shape in meta['shapes'].items():
+            if field in meta['sparse']:
+                arrays[field] = sp.csr_matrix((columns[f'{field}.data'], columns[f'{field}.indices'],
+                                               columns[f'{field}.indptr']), shape=tuple(shape))
+            else:
+                arrays[field] = columns[field].reshape(shape)
+        return cls(meta['kind'], names, arrays, meta['scalars'], validate)
+
+    # Function to write the instance as a directory of .npy files, an .npz or an Arrow file,
+    # chosen by the path's suffix
+    def save(self, path):
+        path = Path(path)
+        columns, meta = self._columns()
+        if path.suffix.lower() == '.npz':
+            np.savez_compressed(path, meta=np.array(json.dumps(meta)), **columns)
+        elif path.suffix.lower() in _ARROW_SUFFIXES:
+            # One row whose columns are the flattened arrays; shapes live in the schema metadata
+            table = pa.table({key: pa.ListArray.from_arrays(pa.array([0, value.size], pa.int32()),
+                                                            pa.array(value.ravel()))
+                              for key, value in columns.items()})
+            table = table.replace_schema_metadata({'optim': json.dumps(meta)})
+            with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            path.mkdir(parents=True, exist_ok=True)
+            for key, value in columns.items():
+                np.save(path / f'{key}.npy', value)
+            (path / _META_FILE).write_text(json.dumps(meta))
+
+    # Function to load an instance written by save(). Directories and Arrow files are
+    # memory-mapped unless mmap is False; mapped arrays are read-only. Pass validate=False
+    # only for files this code wrote and validated before.
+    @classmethod
+    def load(cls, path, mmap=True, validate=True):
+        path = Path(path)
+        if path.suffix.lower() == '.npz':
+            with np.load(path, allow_pickle=False) as archive:
+                columns = {key: archive[key] for key in archive.files}
+            return cls._from_columns(columns, json.loads(str(columns.pop('meta'))), validate)
+        if path.suffix.lower() in _ARROW_SUFFIXES:
+            source = pa.memory_map(str(path)) if mmap else pa.OSFile(str(path))
+            table = pa.ipc.open_file(source).read_all()
+            meta = json.loads(table.schema.metadata[b'optim'])
+            columns = {}
+            for key in table.column_names:
+                values = table[key].chunk(0).values
+                columns[key] = (np.array(values.to_pylist(), dtype=str) if key.startswith('names.')
+                                else values.to_numpy(zero_copy_only=True))
+        else:
+            meta = json.loads((path / _META_FILE).read_text())
+            columns = {file.stem: np.load(file, mmap_mode='r' if mmap else None, allow_pickle=False)
+                       for file in path.glob('*.npy')}
+        instance = cls._from_columns(columns, meta, validate)
+        if mmap:
+            instance.path = path
+        return instance
+
+# Function to tell whether a path holds a saved instance rather than a set of tables
+def is_instance_path(path):
+    path = Path(path)
+    if path.is_dir():
+        return (path / _META_FILE).exists()
+    return path.suffix.lower() in ('.npz', *_ARROW_SUFFIXES)
@@ -0,0 +1,114 @@
+import io
+from pathlib import PurePath
+import numpy as np
+import pandas as pd
+from optim.instance import Instance
+
+# Bulk instance tables. Each table is one CSV or Parquet file, recognised by its file name
+# (without extension); names are matched exactly against the other tables.
+#
+# Factory planning:
+#   products   product, profit
+#   sales      month, product, max_sales      (month order is the order of first appearance)
+#   resources  resource, cost, installed
+#   time_req   resource, product, hours
+#   down       month, resource, down          (optional; missing rows mean nothing is down)
+#   materials  material, availability, cost
+#   usage      material, product, quantity
+# Facility location:
+#   customers  name, x, y[, demand]
+#   facilities name, x, y, setup_cost[, capacity]
+PRODUCTION_TABLES = ('products', 'sales', 'resources', 'time_req', 'down', 'materials', 'usage')
+LOCATION_TABLES = ('customers', 'facilities')
+_NAME_COLUMNS = ('month', 'product', 'resource', 'material')
+
+# Function to read one uploaded table from raw bytes, picking the format from the file name
+def read_table(data, filename):
+    if PurePath(filename).suffix.lower() in ('.parquet', '.pq'):
+        return pd.read_parquet(io.BytesIO(data))
+    return pd.read_csv(io.BytesIO(data))
+
+# Function to read a set of tables given as {file name: bytes}, keyed by table name
+def read_tables(files):
+    return {PurePath(filename).stem: read_table(data, filename) for filename, data in files.items()}
+
+# Function to check that a table exists and has the expected columns
+def _require(tables, name, columns):
+    if name not in tables:
+        raise ValueError(f"Missing table '{name}'")
+    missing = [column for column in columns if column not in tables[name].columns]
+    if missing:
+        raise ValueError(f"Table '{name}' is missing columns {missing}")
+    return tables[name]
+
+# Function to map names to positions, rejecting names that are not declared elsewhere
+def _positions(table, name, column, labels):
+    index = pd.Index(labels).get_indexer(table[column])
+    if (index < 0).any():
+        unknown = table[column][index < 0].unique()[:5].tolist()
+        raise ValueError(f"Table '{name}' refers to unknown {column} values {unknown}")
+    return index
+
+# Function to scatter a long (row, col, value) table into a dense matrix
+def _pivot(tables, name, row, col, value, rows, cols):
+    table = _require(tables, name, (row, col, value))
+    matrix = np.zeros((len(rows), len(cols)))
+    matrix[_positions(table, name, row, rows), _positions(table, name, col, cols)] = table[value].to_numpy(dtype=float)
+    return matrix
+
+# Function to turn factory planning tables into a validated Instance that
+# solve_factory_planning (vectorized) accepts in place of the per-widget dicts
+def production_instance(tables):
+    # Names are compared as strings, whatever type the file reader inferred
+    tables = {name: table.astype({column: str for column in table.columns if column in _NAME_COLUMNS})
+              for name, table in tables.items()}
+    products_table = _require(tables, 'products', ('product', 'profit'))
+    resources_table = _require(tables, 'resources', ('resource', 'cost', 'installed'))
+    materials_table = _require(tables, 'materials', ('material', 'availability', 'cost'))
+    sales_table = _require(tables, 'sales', ('month', 'product', 'max_sales'))
+
+    products = products_table['product'].tolist()
+    resources = resources_table['resource'].tolist()
+    raw_materials = materials_table['material'].tolist()
+    months = pd.unique(sales_table['month']).tolist()
+    for names, what in ((products, 'product'), (resources, 'resource'), (raw_materials, 'material')):
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate {what} names")
+
+    if 'down' in tables:
+        down = _pivot(tables, 'down', 'month', 'resource', 'down', months, resources)
+    else:
+        down = np.zeros((len(months), len(resources)))
+    return Instance.from_dict('production', {
+        'months': months,
+        'products': products,
+        'resources': resources,
+        'raw_materials': raw_materials,
+        'profit': products_table['profit'].to_numpy(dtype=float),
+        'max_sales': _pivot(tables, 'sales', 'month', 'product', 'max_sales', months, products),
+        'resource_cost': resources_table['cost'].to_numpy(dtype=float),
+        'installed': resources_table['installed'].to_numpy(dtype=float),
+        'time_req': _pivot(tables, 'time_req', 'resource', 'product', 'hours', resources, products),
+        'down': down,
+        'raw_material_availability': materials_table['availability'].to_numpy(dtype=float),
+        'raw_material_cost': materials_table['cost'].to_numpy(dtype=float),
+        'material_usage': _pivot(tables, 'usage', 'material', 'product', 'quantity', raw_materials, products),
+    })
+
+# Function to turn facility location tables into a validated Instance of names and
+# coordinate/cost arrays
+def location_instance(tables):
+    customers_table = _require(tables, 'customers', ('name', 'x', 'y'))
+    facilities_table = _require(tables, 'facilities', ('name', 'x', 'y', 'setup_cost'))
+    instance = {
+        'customer_names': customers_table['name'].astype(str).tolist(),
+        'customers': customers_table[['x', 'y']].to_numpy(dtype=float),
+        'facility_names': facilities_table['name'].astype(str).tolist(),
+        'facilities': facilities_table[['x', 'y']].to_numpy(dtype=float),
+        'setup_cost': facilities_table['setup_cost'].to_numpy(dtype=float),
+    }
+    if 'demand' in customers_table.columns:
+        instance['demand'] = customers_table['demand'].to_numpy(dtype=float)
+    if 'capacity' in facilities_table.columns:
+        instance['capacity'] = facilities_table['capacity'].to_numpy(dtype=float)
+    return Instance.from_dict('location', instance)
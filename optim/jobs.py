@@ -0,0 +1,213 @@
+import importlib
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import types
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from optim.telemetry import Telemetry
+
+# Background job queue for long solves. Jobs run in a pool of spawned local worker processes
+# (no broker needed) and report their phases and solver progress (incumbent, bound, gap)
+# through a queue the submitting process drains whenever job status is requested. Running
+# jobs are cancelled through telemetry.cancelled(), which the Gurobi and HiGHS callbacks and
+# the rolling horizon between windows poll; a job that has not started yet is simply dropped.
+# Time limits are passed to the solver, which then returns its best incumbent.
+QUEUED, RUNNING, FINISHED, FAILED, CANCELLED = 'queued', 'running', 'finished', 'failed', 'cancelled'
+ACTIVE = (QUEUED, RUNNING)
+
+# Solver run for each job kind, as (module, function); every one takes telemetry and time_limit
+SOLVERS = {
+    'production': ('optim.production', 'solve_factory_planning'),
+    'production_rolling': ('optim.production', 'solve_factory_planning_rolling'),
+    'location': ('optim.location', 'solve_facility_location'),
+    'capacitated': ('optim.capacitated', 'solve_capacitated_location'),
+}
+
+# Channels of the current worker process
+_events = None
+_cancelled = None
+
+# Function run once in every worker: keep the channels and silence the solver log
+def _init_worker(events, cancelled, threads):
+    global _events, _cancelled
+    _events, _cancelled = events, cancelled
+    try:
+        import gurobipy as gp
+    except ImportError:
+        return
+    gp.setParam('OutputFlag', 0)
+    if threads is not None:
+        gp.setParam('Threads', threads)
+
+# Telemetry forwarding every phase and progress record to the submitting process, and
+# reporting the job cancelled (the flag is looked up at most every min_interval)
+class _JobTelemetry(Telemetry):
+    def __init__(self, job_id):
+        super().__init__(min_interval=0.25)
+        self.job_id = job_id
+        self._cancelled = False
+        self._last_check = -float('inf')
+
+    def mark(self, name):
+        super().mark(name)
+        _events.put((self.job_id, 'phase', self.phases[-1]))
+
+    def _record(self, runtime, **values):
+        super()._record(runtime, **values)
+        _events.put((self.job_id, 'progress', self.progress[-1]))
+
+    def cancelled(self):
+        now = time.monotonic()
+        if not self._cancelled and now - self._last_check >= self.min_interval:
+            self._last_check = now
+            self._cancelled = self.job_id in _cancelled
+        return self._cancelled
+
+    def callback(self, model, where):
+        super().callback(model, where)
+        if self.cancelled():
+            model.terminate()
+
+# Spawned processes re-import the parent's __main__ module; under Streamlit that is the page
+# script, so an empty module stands in for it while processes are started
+@contextmanager
+def _hidden_main():
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+def _run_job(job_id, kind, arguments):
+    _events.put((job_id, 'running', time.time()))
+    module, name = SOLVERS[kind]
+    solve = getattr(importlib.import_module(module), name)
+    result = solve(**arguments, telemetry=_JobTelemetry(job_id))
+    return result, result is not None and result['optimal']
+
+class JobQueue:
+    def __init__(self, workers=1, threads_per_worker=None):
+        context = multiprocessing.get_context('spawn')
+        with _hidden_main():
+            self._manager = context.Manager()
+        self._events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(self._events, self._cancelled, threads_per_worker))
+        self._jobs = {}
+        self._futures = {}
+        self._discarded = set()
+        self._lock = threading.Lock()
+
+    # Function to queue a solve of `kind` (see SOLVERS) with the solver's keyword arguments;
+    # returns the job ID
+    def submit(self, kind, time_limit=None, **arguments):
+        if kind not in SOLVERS:
+            raise ValueError(f"Unknown job kind {kind!r}; expected one of {tuple(SOLVERS)}")
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._jobs[job_id] = {
+                'id': job_id, 'kind': kind, 'status': QUEUED, 'time_limit': time_limit,
+                'submitted': time.time(), 'started': None, 'finished': None,
+                'phases': [], 'progress': [], 'result': None, 'optimal': False, 'error': None,
+            }
+            # Workers are started on demand by submit
+            with _hidden_main():
+                future = self._pool.submit(_run_job, job_id, kind, {**arguments, 'time_limit': time_limit})
+            self._futures[job_id] = future
+        future.add_done_callback(lambda future: self._finish(job_id, future))
+        return job_id
+
+    # Move the records sent by the workers into the job dicts (called with the lock held)
+    def _drain(self):
+        while True:
+            try:
+                job_id, kind, value = self._events.get_nowait()
+            except queue.Empty:
+                return
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            if kind == 'running':
+                job['status'], job['started'] = RUNNING, value
+            elif kind == 'phase':
+                job['phases'].append(value)
+            else:
+                job['progress'].append(value)
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            self._drain()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['finished'] = time.time()
+            if future.cancelled():
+                job['status'] = CANCELLED
+            elif future.exception() is not None:
+                job['status'], job['error'] = FAILED, repr(future.exception())
+            else:
+                job['result'], job['optimal'] = future.result()
+                job['status'] = CANCELLED if job_id in self._cancelled and not job['optimal'] else FINISHED
+            self._cancelled.pop(job_id, None)
+            self._futures.pop(job_id, None)
+            if job_id in self._discarded:
+                self._discarded.discard(job_id)
+                self._jobs.pop(job_id, None)
+
+    # Function to return a snapshot of a job: the fields set at submission plus status,
+    # phases, progress records, the latest incumbent / bound / gap and, once done, the
+    # result (None when no solution was found) and whether it is proven optimal
+    def status(self, job_id):
+        with self._lock:
+            self._drain()
+            job = dict(self._jobs[job_id])
+        job['phases'], job['progress'] = list(job['phases']), list(job['progress'])
+        latest = next((point for point in reversed(job['progress']) if 'incumbent' in point), {})
+        job['incumbent'], job['bound'], job['gap'] = latest.get('incumbent'), latest.get('bound'), latest.get('gap')
+        end = job['finished'] or time.time()
+        job['elapsed'] = None if job['started'] is None else end - job['started']
+        return job
+
+    def jobs(self):
+        with self._lock:
+            job_ids = list(self._jobs)
+        return [self.status(job_id) for job_id in job_ids]
+
+    # Function to cancel a job: queued jobs never start, running ones stop at their next callback
+    def cancel(self, job_id):
+        with self._lock:
+            future = self._futures.get(job_id)
+        # A successful cancel runs _finish right away, so the lock must not be held here
+        if future is not None and not future.cancel() and not future.done():
+            self._cancelled[job_id] = True
+
+    # Function to drop a finished job's record
+    def forget(self, job_id):
+        with self._lock:
+            if self._jobs.get(job_id, {}).get('status') not in ACTIVE:
+                self._jobs.pop(job_id, None)
+
+    # Function to cancel a job nobody will collect; its record is dropped once it has stopped
+    def discard(self, job_id):
+        with self._lock:
+            if job_id in self._futures:
+                self._discarded.add(job_id)
+            else:
+                self._jobs.pop(job_id, None)
+        self.cancel(job_id)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+# Function to rebuild a Telemetry from a job's records, e.g. for ui.diagnostics
+def job_telemetry(job):
+    telemetry = Telemetry()
+    telemetry.phases, telemetry.progress = list(job['phases']), list(job['progress'])
+    return telemetry
@@ -0,0 +1,281 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.spatial import cKDTree
+from optim.backends import MatrixProblem, solve_problem, stack_rows
+from optim.telemetry import NO_TELEMETRY
+
+# Function to compute the (customers x facilities) shipping cost matrix in one broadcast
+def shipping_cost_matrix(customers, facilities, cost_per_mile):
+    customers = np.asarray(customers, dtype=float).reshape(-1, 2)
+    facilities = np.asarray(facilities, dtype=float).reshape(-1, 2)
+    diff = customers[:, np.newaxis, :] - facilities[np.newaxis, :, :]
+    return cost_per_mile * np.hypot(diff[..., 0], diff[..., 1])
+
+# Function to list the customer-facility arcs of the model with their shipping cost.
+# Without k_nearest every pair is an arc; with it, each customer only gets arcs to its
+# k closest facilities, found through a KD-tree. Returns (arc_customer, arc_facility, arc_cost).
+def candidate_arcs(customers, facilities, cost_per_mile, k_nearest=None):
+    customers = np.asarray(customers, dtype=float).reshape(-1, 2)
+    facilities = np.asarray(facilities, dtype=float).reshape(-1, 2)
+    num_customers, num_facilities = len(customers), len(facilities)
+
+    if k_nearest is None or k_nearest >= num_facilities:
+        arc_customer = np.repeat(np.arange(num_customers), num_facilities)
+        arc_facility = np.tile(np.arange(num_facilities), num_customers)
+        arc_cost = shipping_cost_matrix(customers, facilities, cost_per_mile).ravel()
+        return arc_customer, arc_facility, arc_cost
+
+    distance, nearest = cKDTree(facilities).query(customers, k=k_nearest)
+    distance, nearest = distance.reshape(num_customers, -1), nearest.reshape(num_customers, -1)
+    arc_customer = np.repeat(np.arange(num_customers), nearest.shape[1])
+    return arc_customer, nearest.ravel(), cost_per_mile * distance.ravel()
+
+# Linking constraint formulations: 'disaggregated' adds Assign <= Select per arc (tight LP,
+# one row per arc), 'aggregated' adds one row per facility (sum of its Assign <= arcs * Select)
+# and 'benders' keeps only Select in a master problem (see solve_facility_location_benders)
+FORMULATIONS = ('disaggregated', 'aggregated', 'benders')
+
+# Function to build the facility location model through the matrix API; returns the model,
+# its Select and Assign variables and the arcs the Assign entries refer to
+def build_location_model(customers, facilities, setup_cost, cost_per_mile, env=None, k_nearest=None,
+                         formulation='disaggregated'):
+    import gurobipy as gp
+    from gurobipy import GRB
+    num_customers, num_facilities = len(customers), len(facilities)
+    arc_customer, arc_facility, arc_cost = candidate_arcs(customers, facilities, cost_per_mile, k_nearest)
+    num_arcs = len(arc_cost)
+    arc_index = np.arange(num_arcs)
+
+    # Create the optimization model
+    m = gp.Model('facility_location', env=env)
+    m.ModelSense = GRB.MINIMIZE
+
+    # Decision variables, with the setup and shipping costs as objective coefficients
+    select = m.addMVar(num_facilities, vtype=GRB.BINARY, obj=np.asarray(setup_cost, dtype=float), name='Select')
+    assign = m.addMVar(num_arcs, ub=1, obj=arc_cost, name='Assign')
+
+    # Constraints
+    # Setup2ship: an arc can only be used when its facility is built
+    arc_to_facility = sp.csr_matrix((np.ones(num_arcs), (arc_index, arc_facility)), shape=(num_arcs, num_facilities))
+    if formulation == 'aggregated':
+        facility_arcs = arc_to_facility.T.tocsr()
+        arcs_per_facility = sp.diags(np.asarray(facility_arcs.sum(axis=1)).ravel())
+        m.addConstr(facility_arcs @ assign - arcs_per_facility @ select <= np.zeros(num_facilities), name='Setup2ship')
+    elif formulation == 'disaggregated':
+        m.addConstr(assign - arc_to_facility @ select <= np.zeros(num_arcs), name='Setup2ship')
+    else:
+        raise ValueError(f"Unknown formulation {formulation!r}; expected one of {FORMULATIONS}")
+    # Demand: every customer is fully served over its arcs
+    customer_arcs = sp.csr_matrix((np.ones(num_arcs), (arc_customer, arc_index)), shape=(num_customers, num_arcs))
+    m.addConstr(customer_arcs @ assign == np.ones(num_customers), name='Demand')
+    return m, select, assign, (arc_customer, arc_facility)
+
+# Function to turn the indices of facilities to build into a 0/1 Select start vector
+def _select_start(num_facilities, start):
+    values = np.zeros(num_facilities)
+    values[list(start)] = 1.0
+    return values
+
+# Function to solve one facility location instance. Returns None when no optimal solution
+# is found, otherwise a dict with the total cost, the indices of the facilities to build and
+# the shipments as (customer, facility, fraction of demand) tuples. `start` optionally lists
+# facilities to build in a MIP start, e.g. the build plan of a previous, similar instance.
+# With Gurobi, a solve stopped by `time_limit` or interrupted returns its best incumbent.
+def solve_facility_location(customers, facilities, setup_cost, cost_per_mile, env=None, threads=None, k_nearest=None,
+                            formulation='disaggregated', telemetry=None, backend='gurobi', start=None, time_limit=None):
+    if backend != 'gurobi':
+        if formulation == 'benders':
+            raise ValueError("The Benders formulation relies on Gurobi lazy constraint callbacks")
+        return solve_facility_location_backend(
+            customers, facilities, setup_cost, cost_per_mile, backend, threads=threads, k_nearest=k_nearest,
+            formulation=formulation, telemetry=telemetry, start=start, time_limit=time_limit
+        )
+    if formulation == 'benders':
+        return solve_facility_location_benders(
+            customers, facilities, setup_cost, cost_per_mile, env=env, threads=threads, k_nearest=k_nearest,
+            telemetry=telemetry, start=start, time_limit=time_limit
+        )
+    telemetry = telemetry or NO_TELEMETRY
+    m, select, assign, arcs = build_location_model(
+        customers, facilities, setup_cost, cost_per_mile, env=env, k_nearest=k_nearest, formulation=formulation
+    )
+    if threads is not None:
+        m.Params.Threads = threads
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    if start is not None:
+        select.Start = _select_start(len(facilities), start)
+    telemetry.mark('build')
+    m.optimize(telemetry.callback)
+    telemetry.mark('optimize')
+    result = extract_location_solution(m, select, assign, arcs)
+    telemetry.mark('extract')
+    return result
+
+# Function to tell whether a Gurobi model ended with an incumbent worth reporting
+def _has_incumbent(m):
+    from gurobipy import GRB
+    return m.status in (GRB.OPTIMAL, GRB.TIME_LIMIT, GRB.INTERRUPTED) and m.SolCount > 0
+
+# Function to read the solution of a model from build_location_model into the result dict
+def extract_location_solution(m, select, assign, arcs):
+    from gurobipy import GRB
+    if not _has_incumbent(m):
+        return None
+    return _location_result(m.objVal, select.X, assign.X, arcs, m.status == GRB.OPTIMAL)
+
+def _location_result(cost, selected, shipped, arcs, optimal):
+    arc_customer, arc_facility = arcs
+    used = np.flatnonzero(np.abs(shipped) > 1e-6)
+    return {
+        'cost': cost,
+        'optimal': optimal,
+        'build': np.flatnonzero(np.abs(selected) > 1e-6).tolist(),
+        'shipments': list(zip(arc_customer[used].tolist(), arc_facility[used].tolist(), shipped[used].tolist())),
+    }
+
+# Function to describe the facility location model as a solver-agnostic MatrixProblem over
+# x = [Select, Assign]; returns the problem and the arcs the Assign entries refer to
+def location_problem(customers, facilities, setup_cost, cost_per_mile, k_nearest=None, formulation='disaggregated',
+                     start=None):
+    num_customers, num_facilities = len(customers), len(facilities)
+    arc_customer, arc_facility, arc_cost = candidate_arcs(customers, facilities, cost_per_mile, k_nearest)
+    num_arcs = len(arc_cost)
+    arc_index = np.arange(num_arcs)
+
+    arc_to_facility = sp.csr_matrix((np.ones(num_arcs), (arc_index, arc_facility)), shape=(num_arcs, num_facilities))
+    if formulation == 'aggregated':
+        facility_arcs = arc_to_facility.T.tocsr()
+        arcs_per_facility = sp.diags(np.asarray(facility_arcs.sum(axis=1)).ravel())
+        linking = sp.hstack([-arcs_per_facility, facility_arcs])
+    elif formulation == 'disaggregated':
+        linking = sp.hstack([-arc_to_facility, sp.eye(num_arcs)])
+    else:
+        raise ValueError(f"Formulation {formulation!r} has no single-model form; expected 'disaggregated' or 'aggregated'")
+    customer_arcs = sp.csr_matrix((np.ones(num_arcs), (arc_customer, arc_index)), shape=(num_customers, num_arcs))
+    demand = sp.hstack([sp.csr_matrix((num_customers, num_facilities)), customer_arcs])
+
+    A, row_lower, row_upper = stack_rows([(linking, -np.inf, 0.0), (demand, 1.0, 1.0)])
+    problem = MatrixProblem(
+        np.concatenate([np.asarray(setup_cost, dtype=float), arc_cost]), A, row_lower, row_upper, ub=1.0,
+        integer=np.arange(num_facilities + num_arcs) < num_facilities, name='facility_location',
+        start=None if start is None else np.concatenate([_select_start(num_facilities, start), np.full(num_arcs, np.nan)])
+    )
+    return problem, (arc_customer, arc_facility)
+
+# Function to solve facility location through a solver backend from optim.backends
+def solve_facility_location_backend(customers, facilities, setup_cost, cost_per_mile, backend, threads=None,
+                                    k_nearest=None, formulation='disaggregated', telemetry=None, start=None,
+                                    time_limit=None):
+    telemetry = telemetry or NO_TELEMETRY
+    problem, arcs = location_problem(customers, facilities, setup_cost, cost_per_mile, k_nearest, formulation, start)
+    telemetry.mark('build')
+    solved = solve_problem(problem, backend, threads=threads, time_limit=time_limit, telemetry=telemetry)
+    telemetry.mark('optimize')
+    if solved is None:
+        return None
+    cost, x, optimal = solved
+    result = _location_result(cost, x[:len(facilities)], x[len(facilities):], arcs, optimal)
+    telemetry.mark('extract')
+    return result
+
+# Function to evaluate every customer's subproblem for the built facilities `is_open`:
+# the cheapest open arc cost per customer, with arcs stored customer-major from arc_start
+def _serving_cost(is_open, arc_facility, arc_cost, arc_start):
+    open_cost = np.where(is_open[arc_facility], arc_cost, np.inf)
+    return np.minimum.reduceat(open_cost, arc_start[:-1])
+
+# Function to solve facility location by Benders decomposition. The master problem holds
+# Select plus one Cost variable per customer. For a master solution y, customer c's
+# subproblem has the closed form v_c = min over built candidate facilities of the shipping
+# cost, and the optimality cut
+#     Cost[c] >= v_c - sum_f max(0, v_c - cost[c, f]) * Select[f]
+# is added lazily from a MIPSOL callback. No Assign variables are ever created.
+def solve_facility_location_benders(customers, facilities, setup_cost, cost_per_mile, env=None, threads=None,
+                                    k_nearest=None, telemetry=None, start=None, time_limit=None):
+    import gurobipy as gp
+    from gurobipy import GRB
+    telemetry = telemetry or NO_TELEMETRY
+    num_customers, num_facilities = len(customers), len(facilities)
+    arc_customer, arc_facility, arc_cost = candidate_arcs(customers, facilities, cost_per_mile, k_nearest)
+    arc_start = np.searchsorted(arc_customer, np.arange(num_customers + 1))
+
+    # Master problem
+    m = gp.Model('facility_location_benders', env=env)
+    m.ModelSense = GRB.MINIMIZE
+    m.Params.LazyConstraints = 1
+    if threads is not None:
+        m.Params.Threads = threads
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    select = m.addMVar(num_facilities, vtype=GRB.BINARY, obj=np.asarray(setup_cost, dtype=float), name='Select')
+    cost = m.addMVar(num_customers, lb=np.minimum.reduceat(arc_cost, arc_start[:-1]), obj=1.0, name='Cost')
+
+    # Cover: every customer must have at least one built candidate facility
+    if k_nearest is None or k_nearest >= num_facilities:
+        m.addConstr(np.ones((1, num_facilities)) @ select >= np.ones(1), name='Cover')
+    else:
+        candidates = sp.csr_matrix((np.ones(len(arc_cost)), (arc_customer, arc_facility)),
+                                   shape=(num_customers, num_facilities))
+        m.addConstr(candidates @ select >= np.ones(num_customers), name='Cover')
+
+    select_vars = select.tolist()
+    cost_vars = cost.tolist()
+
+    def add_optimality_cuts(model, where):
+        if where != GRB.Callback.MIPSOL:
+            return
+        is_open = np.array(model.cbGetSolution(select_vars)) > 0.5
+        estimate = np.array(model.cbGetSolution(cost_vars))
+        serving = _serving_cost(is_open, arc_facility, arc_cost, arc_start)
+        for c in np.flatnonzero(estimate < serving - 1e-6 * np.maximum(1.0, np.abs(serving))):
+            arcs = slice(arc_start[c], arc_start[c + 1])
+            saving = serving[c] - arc_cost[arcs]
+            useful = saving > 0
+            facilities_used = arc_facility[arcs][useful]
+            model.cbLazy(
+                cost_vars[c] + gp.LinExpr(saving[useful].tolist(), [select_vars[f] for f in facilities_used]) >= float(serving[c])
+            )
+
+    # A start also fixes Cost at the subproblem values, so it is a complete solution
+    if start is not None:
+        is_open = _select_start(num_facilities, start) > 0.5
+        serving = _serving_cost(is_open, arc_facility, arc_cost, arc_start)
+        if np.isfinite(serving).all():
+            select.Start = is_open.astype(float)
+            cost.Start = serving
+
+    telemetry.mark('build')
+    m.optimize(telemetry.wrap(add_optimality_cuts))
+    telemetry.mark('optimize')
+
+    if not _has_incumbent(m):
+        return None
+    is_open = select.X > 0.5
+    # candidate_arcs gives every customer the same number of arcs
+    open_cost = np.where(is_open[arc_facility], arc_cost, np.inf).reshape(num_customers, -1)
+    best = arc_start[:-1] + open_cost.argmin(axis=1)
+    result = {
+        'cost': m.objVal,
+        'optimal': m.status == GRB.OPTIMAL,
+        'build': np.flatnonzero(is_open).tolist(),
+        'shipments': [(c, f, 1.0) for c, f in enumerate(arc_facility[best].tolist())],
+    }
+    telemetry.mark('extract')
+    return result
+
+# Function to measure what k-nearest pruning costs on an instance small enough to also
+# solve unpruned (at most `max_arcs` customer-facility pairs); the gap is relative to the
+# unpruned optimum
+def pruning_gap(customers, facilities, setup_cost, cost_per_mile, k_nearest, env=None, max_arcs=200_000):
+    if len(customers) * len(facilities) > max_arcs:
+        return None
+    pruned = solve_facility_location(customers, facilities, setup_cost, cost_per_mile, env=env, k_nearest=k_nearest)
+    full = solve_facility_location(customers, facilities, setup_cost, cost_per_mile, env=env)
+    if pruned is None or full is None:
+        return None
+    return {
+        'pruned_cost': pruned['cost'],
+        'full_cost': full['cost'],
+        'gap': (pruned['cost'] - full['cost']) / max(abs(full['cost']), 1e-10),
+    }
@@ -0,0 +1,534 @@
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from optim.backends import MatrixProblem, solve_problem, stack_rows
+from optim.instance import SCHEMAS, Instance, as_matrix, as_vector
+from optim.telemetry import NO_TELEMETRY
+
+# Function to convert the user input into dense NumPy arrays indexed by position
+def _to_arrays(user_input):
+    months = user_input['months']
+    products = user_input['products']
+    resources = user_input['resources']
+    raw_materials = user_input['raw_materials']
+    return {
+        'profit': as_vector(user_input['profit'], products),
+        'max_sales': as_matrix(user_input['max_sales'], months, products),
+        'resource_cost': as_vector(user_input['resource_cost'], resources),
+        'time_req': as_matrix(user_input['time_req'], resources, products),
+        'down': as_matrix(user_input['down'], months, resources),
+        'installed': as_vector(user_input['installed'], resources),
+        'raw_material_availability': as_vector(user_input['raw_material_availability'], raw_materials),
+        'raw_material_cost': as_vector(user_input['raw_material_cost'], raw_materials),
+        'material_usage': as_matrix(user_input['material_usage'], raw_materials, products),
+        'holding_cost': float(user_input['holding_cost']),
+        'max_inventory': float(user_input['max_inventory']),
+        'store_target': float(user_input['store_target']),
+        'hours_per_month': float(user_input['hours_per_month']),
+    }
+
+# Function to wrap (months x products) solution arrays into the result dict;
+# raw material usage is one matrix product instead of a loop over cells. `optimal` is False
+# for plans that are not proven optimal, such as rolling-horizon plans.
+def _assemble_result(objective, make_plan, sell_plan, store_plan, material_usage, user_input, optimal=True):
+    months = user_input['months']
+    products = user_input['products']
+    return {
+        'profit': objective,
+        'optimal': optimal,
+        'make_plan': pd.DataFrame(make_plan, index=months, columns=products),
+        'sell_plan': pd.DataFrame(sell_plan, index=months, columns=products),
+        'store_plan': pd.DataFrame(store_plan, index=months, columns=products),
+        'raw_material_plan': pd.DataFrame(make_plan @ material_usage.T, index=months, columns=user_input['raw_materials'])
+    }
+
+# Function to compute the key that decides whether a built model can be reused
+def planning_structure(user_input):
+    return tuple(tuple(user_input[key]) for key in ('months', 'products', 'resources', 'raw_materials'))
+
+# Function to compute the (make, store, sell) objective coefficients: per-unit profit on sales,
+# holding cost on inventory, resource hours and raw materials charged on production
+def _objective_coefficients(data, n_months):
+    make_cost = data['time_req'].T @ data['resource_cost'] + data['material_usage'].T @ data['raw_material_cost']
+    n = n_months * len(data['profit'])
+    return np.tile(-make_cost, n_months), np.full(n, -data['holding_cost']), np.tile(data['profit'], n_months)
+
+# Function to compute the Capacity right-hand side, one entry per (month, resource)
+def _available_hours(data):
+    return (data['hours_per_month'] * (data['installed'][np.newaxis, :] - data['down'])).ravel()
+
+# Factory planning LP built through Gurobi's matrix API. Variables are laid out
+# month-major (entry month * n_products + product). The model can be kept between
+# solves: update() changes coefficients, bounds and right-hand sides in place, so
+# Gurobi re-optimizes from the previous basis instead of starting cold.
+class FactoryPlanningModel:
+    def __init__(self, user_input, telemetry=None):
+        import gurobipy as gp
+        from gurobipy import GRB
+        telemetry = telemetry or NO_TELEMETRY
+        self.structure = planning_structure(user_input)
+        self.user_input = user_input
+        self.data = data = _to_arrays(user_input)
+
+        n_months, n_products = len(user_input['months']), len(user_input['products'])
+        n = n_months * n_products
+        self.shape = (n_months, n_products)
+        make_obj, store_obj, sell_obj = _objective_coefficients(data, n_months)
+
+        # Model Initialization
+        self.factory = factory = gp.Model('Factory Planning')
+        factory.ModelSense = GRB.MAXIMIZE
+
+        # Decision Variables
+        self.make = factory.addMVar(n, obj=make_obj, name="Make")
+        self.store = factory.addMVar(n, ub=data['max_inventory'], obj=store_obj, name="Store")
+        self.sell = factory.addMVar(n, ub=data['max_sales'].ravel(), obj=sell_obj, name="Sell")
+
+        # Constraints
+        # Balance: store of the previous month + make == sell + store (no previous store in the first month)
+        previous = sp.kron(sp.eye(n_months, k=-1), sp.eye(n_products), format='csr')
+        self.balance = factory.addConstr(
+            previous @ self.store + self.make - self.sell - self.store == np.zeros(n), name="Balance"
+        )
+        # Final inventory targets
+        self.end_balance = factory.addConstr(
+            self.store[-n_products:] == np.full(n_products, data['store_target']), name="End_Balance"
+        )
+        # Resource capacity constraints, one row per (month, resource)
+        capacity = sp.kron(sp.eye(n_months), sp.csr_matrix(data['time_req']), format='csr')
+        self.capacity = factory.addConstr(capacity @ self.make <= _available_hours(data), name="Capacity")
+        # Raw material constraints, summed over the whole horizon
+        consumption = sp.kron(np.ones((1, n_months)), sp.csr_matrix(data['material_usage']), format='csr')
+        self.raw_material_limit = factory.addConstr(
+            consumption @ self.make <= data['raw_material_availability'], name="Raw_Material_Limit"
+        )
+        telemetry.mark('build')
+
+    # Apply a new set of parameters with the same structure to the built model
+    def update(self, user_input, telemetry=None):
+        if planning_structure(user_input) != self.structure:
+            raise ValueError("The problem structure changed; build a new FactoryPlanningModel instead.")
+        old, data = self.data, _to_arrays(user_input)
+        n_months, n_products = self.shape
+        changed = lambda *keys: any(not np.array_equal(data[key], old[key]) for key in keys)
+
+        # Objective coefficients and variable bounds, where their inputs changed
+        if changed('profit', 'holding_cost', 'time_req', 'resource_cost', 'material_usage', 'raw_material_cost'):
+            self.make.Obj, self.store.Obj, self.sell.Obj = _objective_coefficients(data, n_months)
+        if changed('max_inventory'):
+            self.store.UB = np.full(n_months * n_products, data['max_inventory'])
+        if changed('max_sales'):
+            self.sell.UB = data['max_sales'].ravel()
+
+        # Right-hand sides
+        if changed('store_target'):
+            self.end_balance.RHS = np.full(n_products, data['store_target'])
+        if changed('hours_per_month', 'installed', 'down'):
+            self.capacity.RHS = _available_hours(data)
+        if changed('raw_material_availability'):
+            self.raw_material_limit.RHS = data['raw_material_availability']
+
+        # Matrix coefficients: only touch the entries that actually changed
+        make_vars = self.make.tolist()
+        n_resources = old['time_req'].shape[0]
+        changed = np.argwhere(data['time_req'] != old['time_req'])
+        if len(changed):
+            capacity_rows = self.capacity.tolist()
+            for resource, product in changed:
+                for month in range(n_months):
+                    self.factory.chgCoeff(
+                        capacity_rows[month * n_resources + resource], make_vars[month * n_products + product],
+                        data['time_req'][resource, product]
+                    )
+        changed = np.argwhere(data['material_usage'] != old['material_usage'])
+        if len(changed):
+            material_rows = self.raw_material_limit.tolist()
+            for material, product in changed:
+                for month in range(n_months):
+                    self.factory.chgCoeff(
+                        material_rows[material], make_vars[month * n_products + product],
+                        data['material_usage'][material, product]
+                    )
+
+        self.user_input = user_input
+        self.data = data
+        (telemetry or NO_TELEMETRY).mark('update')
+
+    # Current simplex basis, to warm-start later solves from
+    def basis(self):
+        return (
+            [variables.VBasis for variables in (self.make, self.store, self.sell)],
+            [rows.CBasis for rows in (self.balance, self.end_balance, self.capacity, self.raw_material_limit)]
+        )
+
+    def set_basis(self, basis):
+        vbasis, cbasis = basis
+        for variables, values in zip((self.make, self.store, self.sell), vbasis):
+            variables.VBasis = values
+        for rows, values in zip((self.balance, self.end_balance, self.capacity, self.raw_material_limit), cbasis):
+            rows.CBasis = values
+
+    # Optimize and return the result dict, or None when no optimal plan exists
+    def solve(self, telemetry=None):
+        telemetry = telemetry or NO_TELEMETRY
+        self.factory.optimize(telemetry.callback)
+        telemetry.mark('optimize')
+        result = self.result()
+        telemetry.mark('extract')
+        return result
+
+    # Result dict of the last optimization, or None when it did not reach an optimal plan
+    def result(self):
+        from gurobipy import GRB
+        if self.factory.status != GRB.OPTIMAL:
+            return None
+        return _assemble_result(
+            self.factory.objVal, self.make.X.reshape(self.shape), self.sell.X.reshape(self.shape),
+            self.store.X.reshape(self.shape), self.data['material_usage'], self.user_input
+        )
+
+# Name lists indexing each array-valued parameter, used to apply scenario deltas by name
+_PARAM_AXES = SCHEMAS['production']['arrays']
+
+# Function to apply a scenario to the user input. A scenario is a dict with a 'name' and
+# optional 'scale' / 'set' entries mapping a parameter to either one value applied to the
+# whole parameter or a {name or (name, name): value} dict, e.g.
+# {'name': 'Demand +10%', 'scale': {'max_sales': 1.1}}
+# {'name': 'Press down in May', 'set': {'down': {('May', 'Press'): 1}}}
+def apply_scenario(user_input, scenario):
+    updated = dict(user_input)
+    data = _to_arrays(user_input)
+    for operation in ('scale', 'set'):
+        for param, change in scenario.get(operation, {}).items():
+            if param not in _PARAM_AXES:
+                data[param] = data[param] * change if operation == 'scale' else change
+                updated[param] = data[param]
+                continue
+            value = data[param].copy()
+            entries = change.items() if isinstance(change, dict) else [(None, change)]
+            for key, amount in entries:
+                if key is None:
+                    index = slice(None)
+                else:
+                    names = key if isinstance(key, tuple) else (key,)
+                    index = tuple(list(user_input[axis]).index(name) for axis, name in zip(_PARAM_AXES[param], names))
+                value[index] = value[index] * amount if operation == 'scale' else amount
+            data[param] = updated[param] = value
+    return updated
+
+# Function to build the usual sensitivity scenarios: demand changes (in %), one extra
+# machine down per (month, resource), and a shortage (in %) of each raw material
+def standard_scenarios(user_input, demand_changes=(), extra_downtime=False, shortage=0):
+    scenarios = [
+        {'name': f"Demand {change:+g}%", 'scale': {'max_sales': 1 + change / 100}} for change in demand_changes
+    ]
+    if extra_downtime:
+        down = _to_arrays(user_input)['down']
+        for i, month in enumerate(user_input['months']):
+            for j, resource in enumerate(user_input['resources']):
+                scenarios.append({
+                    'name': f"{resource} down in {month}", 'set': {'down': {(month, resource): down[i, j] + 1}}
+                })
+    if shortage:
+        for material in user_input['raw_materials']:
+            scenarios.append({
+                'name': f"{material} -{shortage:g}%", 'scale': {'raw_material_availability': {material: 1 - shortage / 100}}
+            })
+    return scenarios
+
+# Function to sum up the model's last solution for the scenario comparison table, straight
+# from the solution vectors instead of through the plan DataFrames
+def _plan_totals(model):
+    make = model.make.X.reshape(model.shape)
+    return {
+        'Total Production': make.sum(),
+        'Total Sales': model.sell.X.sum(),
+        'Raw Material Used': (make @ model.data['material_usage'].T).sum(),
+    }
+
+# Function to solve a batch of scenarios against one base model. Every scenario is applied
+# in place and warm-started from the base basis; returns the comparison table (first row is
+# the base case, with per-scenario wall time) or None when the base case has no optimal plan.
+def run_scenario_sweep(user_input, scenarios):
+    from gurobipy import GRB
+    # Gurobi status codes by name, e.g. GRB.INFEASIBLE -> 'Infeasible'
+    status_names = {getattr(GRB.Status, name): name.replace('_', ' ').title()
+                    for name in dir(GRB.Status) if name.isupper()}
+    model = FactoryPlanningModel(user_input)
+    model.factory.Params.OutputFlag = 0
+
+    start = time.perf_counter()
+    model.factory.optimize()
+    if model.factory.Status != GRB.OPTIMAL:
+        return None
+    totals = _plan_totals(model)
+    rows = [{'Scenario': 'Base', 'Status': 'Optimal', 'Profit': model.factory.ObjVal, **totals,
+             'Solve Time (s)': time.perf_counter() - start}]
+    basis = model.basis()
+
+    for scenario in scenarios:
+        start = time.perf_counter()
+        model.update(apply_scenario(user_input, scenario))
+        model.set_basis(basis)
+        model.factory.optimize()
+        status = model.factory.Status
+        row = {'Scenario': scenario['name'], 'Status': status_names.get(status, str(status))}
+        if status == GRB.OPTIMAL:
+            row['Profit'] = model.factory.ObjVal
+            row.update(_plan_totals(model))
+        row['Solve Time (s)'] = time.perf_counter() - start
+        rows.append(row)
+
+    # Deltas against the base case, next to each absolute column
+    table = pd.DataFrame(rows)
+    for column in ['Profit', *totals]:
+        table.insert(table.columns.get_loc(column) + 1, f"{column} Change", table[column] - table.loc[0, column])
+    return table
+
+# Function to describe the factory planning LP as a solver-agnostic MatrixProblem over
+# x = [make, store, sell], each laid out month-major like FactoryPlanningModel.
+# `initial_store` is the inventory entering the first month (none by default) and
+# `end_target=False` drops the final inventory targets, as used for rolling-horizon windows.
+def factory_planning_problem(user_input, initial_store=None, end_target=True):
+    data = _to_arrays(user_input)
+    n_months, n_products = len(user_input['months']), len(user_input['products'])
+    n = n_months * n_products
+    identity = sp.eye(n, format='csr')
+    empty = sp.csr_matrix((n_products, n))
+
+    # Balance: make + store of the previous month - store - sell == 0
+    previous = sp.kron(sp.eye(n_months, k=-1), sp.eye(n_products), format='csr')
+    balance = sp.hstack([identity, previous - identity, -identity])
+    # Final inventory targets
+    end_balance = sp.hstack([empty, sp.eye(n_products, n, k=n - n_products), empty])
+    # Resource capacity and raw material limits only involve make
+    capacity = sp.kron(sp.eye(n_months), sp.csr_matrix(data['time_req']))
+    consumption = sp.kron(np.ones((1, n_months)), sp.csr_matrix(data['material_usage']))
+    pad = lambda block: sp.hstack([block, sp.csr_matrix((block.shape[0], 2 * n))])
+
+    balance_rhs = np.zeros(n)
+    if initial_store is not None:
+        balance_rhs[:n_products] = -np.asarray(initial_store, dtype=float)
+    blocks = [(balance, balance_rhs, balance_rhs)]
+    if end_target:
+        blocks.append((end_balance, data['store_target'], data['store_target']))
+    A, row_lower, row_upper = stack_rows(blocks + [
+        (pad(capacity), -np.inf, _available_hours(data)),
+        (pad(consumption), -np.inf, data['raw_material_availability']),
+    ])
+    make_obj, store_obj, sell_obj = _objective_coefficients(data, n_months)
+    ub = np.concatenate([np.full(n, np.inf), np.full(n, data['max_inventory']), data['max_sales'].ravel()])
+    return MatrixProblem(np.concatenate([make_obj, store_obj, sell_obj]), A, row_lower, row_upper, ub=ub,
+                         maximize=True, name='Factory Planning')
+
+# Function to solve the factory planning problem through a solver backend from optim.backends
+def solve_factory_planning_backend(user_input, backend, telemetry=None, threads=None, env=None, time_limit=None):
+    telemetry = telemetry or NO_TELEMETRY
+    problem = factory_planning_problem(user_input)
+    telemetry.mark('build')
+    solved = solve_problem(problem, backend, threads=threads, time_limit=time_limit, env=env, telemetry=telemetry)
+    telemetry.mark('optimize')
+    if solved is None:
+        return None
+    objective, x, _ = solved
+    make_plan, store_plan, sell_plan = x.reshape(3, len(user_input['months']), len(user_input['products']))
+    material_usage = as_matrix(user_input['material_usage'], user_input['raw_materials'], user_input['products'])
+    result = _assemble_result(objective, make_plan, sell_plan, store_plan, material_usage, user_input)
+    telemetry.mark('extract')
+    return result
+
+# Function to solve factory planning by rolling horizon, for horizons too long to solve in one
+# piece. Windows of `window` months are solved in sequence and each commits its first `step`
+# months (default: half the window, so consecutive windows overlap); the last window runs to
+# the end of the horizon and alone carries the final inventory targets. Between windows the
+# committed inventory enters the next window as its initial stock, and the raw materials still
+# available are shared out in proportion to the months each window covers, since the
+# Raw_Material_Limit rows couple the whole horizon. Memory is bounded by one window's model.
+# `time_limit` caps the total time; None is returned when it runs out, a window is infeasible
+# or the telemetry reports the run cancelled, which is checked before every window.
+def solve_factory_planning_rolling(user_input, window=12, step=None, backend='gurobi', telemetry=None,
+                                   threads=None, env=None, time_limit=None):
+    telemetry = telemetry or NO_TELEMETRY
+    months = list(user_input['months'])
+    n_months, n_products = len(months), len(user_input['products'])
+    step = step or max(1, window // 2)
+    if not 0 < step <= window:
+        raise ValueError(f"The step must be between 1 and the window length {window}, got {step}")
+    data = _to_arrays(user_input)
+    base = {**user_input, **data}
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+    make_plan, store_plan, sell_plan = (np.zeros((n_months, n_products)) for _ in range(3))
+    inventory = np.zeros(n_products)
+    consumed = np.zeros(len(data['raw_material_availability']))
+    for start in range(0, n_months, step):
+        end = min(start + window, n_months)
+        last = end == n_months
+        remaining = data['raw_material_availability'] - consumed
+        window_input = {
+            **base,
+            'months': months[start:end],
+            'max_sales': data['max_sales'][start:end],
+            'down': data['down'][start:end],
+            'raw_material_availability': remaining if last else remaining * (end - start) / (n_months - start),
+        }
+        problem = factory_planning_problem(window_input, initial_store=inventory, end_target=last)
+        telemetry.mark('build')
+        budget = None if deadline is None else deadline - time.perf_counter()
+        if budget is not None and budget <= 0 or telemetry.cancelled():
+            return None
+        solved = solve_problem(problem, backend, threads=threads, time_limit=budget, env=env, telemetry=telemetry)
+        telemetry.mark('optimize')
+        if solved is None:
+            return None
+
+        # Commit the first `step` months (all of them in the last window) and carry state forward
+        commit = end - start if last else min(step, end - start)
+        make, store, sell = solved[1].reshape(3, end - start, n_products)
+        make_plan[start:start + commit] = make[:commit]
+        store_plan[start:start + commit] = store[:commit]
+        sell_plan[start:start + commit] = sell[:commit]
+        inventory = store[commit - 1]
+        consumed += data['material_usage'] @ make[:commit].sum(axis=0)
+        if last:
+            break
+
+    make_obj, store_obj, sell_obj = _objective_coefficients(data, n_months)
+    profit = make_obj @ make_plan.ravel() + store_obj @ store_plan.ravel() + sell_obj @ sell_plan.ravel()
+    result = _assemble_result(profit, make_plan, sell_plan, store_plan, data['material_usage'], user_input, False)
+    telemetry.mark('extract')
+    return result
+
+# Function to measure what the rolling horizon gives up against the monolithic model, for
+# instances small enough to also solve in one piece (at most `max_variables` columns); the
+# gap is relative to the full optimum. Pass the rolling-horizon result when it is already
+# known, so only the full model is solved.
+def rolling_horizon_gap(user_input, window=12, step=None, backend='gurobi', max_variables=3_000_000, rolling=None):
+    if 3 * len(user_input['months']) * len(user_input['products']) > max_variables:
+        return None
+    if rolling is None:
+        rolling = solve_factory_planning_rolling(user_input, window, step, backend=backend)
+    full = solve_factory_planning_backend(user_input, backend)
+    if rolling is None or full is None:
+        return None
+    return {
+        'rolling_profit': rolling['profit'],
+        'full_profit': full['profit'],
+        'gap': (full['profit'] - rolling['profit']) / max(abs(full['profit']), 1e-10),
+    }
+
+# Function to solve the factory planning problem through Gurobi's matrix API
+def solve_factory_planning_matrix(user_input, telemetry=None, time_limit=None):
+    model = FactoryPlanningModel(user_input, telemetry)
+    if time_limit is not None:
+        model.factory.Params.TimeLimit = time_limit
+    return model.solve(telemetry)
+
+# Function to solve the factory planning optimization problem; pass a Telemetry to record
+# build / optimize / extract timings and solver progress. With a backend other than
+# 'gurobi' the model is built from sparse arrays whatever `vectorized` says, and an Instance
+# always goes to the matrix builder, since the dict builder needs name-keyed dicts.
+def solve_factory_planning(user_input, vectorized=False, telemetry=None, backend='gurobi', time_limit=None):
+    if backend != 'gurobi':
+        return solve_factory_planning_backend(user_input, backend, telemetry, time_limit=time_limit)
+    if vectorized or isinstance(user_input, Instance):
+        return solve_factory_planning_matrix(user_input, telemetry, time_limit)
+    import gurobipy as gp
+    from gurobipy import GRB
+    telemetry = telemetry or NO_TELEMETRY
+
+    # Unpacking user input
+    products = user_input['products']
+    months = user_input['months']
+
+    profit = user_input['profit']
+    max_sales = user_input['max_sales']
+
+    holding_cost = user_input['holding_cost']
+    max_inventory = user_input['max_inventory']
+    store_target = user_input['store_target']
+    hours_per_month = user_input['hours_per_month']
+
+    resources = user_input['resources']
+    resource_cost = user_input['resource_cost']
+    time_req = user_input['time_req']
+    down = user_input['down']
+    installed = user_input['installed']
+
+    raw_materials = user_input['raw_materials']
+    raw_material_availability = user_input['raw_material_availability']
+    raw_material_cost = user_input['raw_material_cost']
+    material_usage = user_input['material_usage']
+
+    # Model Initialization
+    factory = gp.Model('Factory Planning')
+
+    # Decision Variables
+    make = factory.addVars([(month, product) for month in months for product in products], name="Make")
+    store = factory.addVars([(month, product) for month in months for product in products], ub=max_inventory, name="Store")
+    sell = factory.addVars([(month, product) for month in months for product in products], ub=max_sales, name="Sell")
+
+    # Constraints
+    # Initial balance
+    factory.addConstrs(
+        (make[months[0], product] == sell[months[0], product] + store[months[0], product] for product in products),
+        name="Initial_Balance"
+    )
+    # Balance for subsequent months
+    factory.addConstrs(
+        (store[prev_month, product] + make[month, product] == sell[month, product] + store[month, product]
+         for product in products for prev_month, month in zip(months, months[1:])),
+        name="Balance"
+    )
+    # Final inventory targets
+    factory.addConstrs(
+        (store[months[-1], product] == store_target for product in products),
+        name="End_Balance"
+    )
+    # Resource capacity constraints
+    factory.addConstrs(
+        (gp.quicksum(time_req[resource][product] * make[month, product] for product in time_req[resource]) <= 
+         hours_per_month * (installed[resource] - down.get((month, resource), 0))
+         for resource in resources for month in months),
+        name="Capacity"
+    )
+    # Raw material constraints
+    factory.addConstrs(
+        (gp.quicksum(material_usage[material][product] * make[month, product] for product in products for month in months) <= 
+         raw_material_availability[material] for material in raw_materials),
+        name="Raw_Material_Limit"
+    )
+
+    # Objective Function
+    obj = (
+        gp.quicksum(profit[product] * sell[month, product] - holding_cost * store[month, product] for month in months for product in products)
+        - gp.quicksum(resource_cost[resource] * gp.quicksum(time_req[resource][product] * make[month, product] for product in products)
+                      for resource in resources for month in months)
+        - gp.quicksum(raw_material_cost[material] * gp.quicksum(material_usage[material][product] * make[month, product] for product in products for month in months)
+                      for material in raw_materials)
+    )
+    factory.setObjective(obj, GRB.MAXIMIZE)
+    if time_limit is not None:
+        factory.Params.TimeLimit = time_limit
+    telemetry.mark('build')
+
+    # Optimization
+    factory.optimize(telemetry.callback)
+    telemetry.mark('optimize')
+
+    # Results
+    if factory.status == GRB.OPTIMAL:
+        shape = (len(months), len(products))
+        result = _assemble_result(
+            factory.objVal,
+            np.array(factory.getAttr('X', list(make.values()))).reshape(shape),
+            np.array(factory.getAttr('X', list(sell.values()))).reshape(shape),
+            np.array(factory.getAttr('X', list(store.values()))).reshape(shape),
+            as_matrix(material_usage, raw_materials, products),
+            user_input
+        )
+        telemetry.mark('extract')
+        return result
+    else:
+        return None
@@ -0,0 +1,106 @@
+import json
+import logging
+import time
+
+logger = logging.getLogger('optim.telemetry')
+
+# Per-solve instrumentation. Phases are recorded with mark(name), which closes a phase
+# running since the previous mark (or since creation), measuring wall and CPU time.
+# Passing `callback` to Model.optimize records solver progress: incumbent, bound, node
+# count and MIP gap for MIPs (plus the objective of every new solution found), and
+# objective and iteration count for simplex. Other solvers report through due() and
+# record_mip() (see optim.backends.highs), and poll cancelled() to stop early.
+class Telemetry:
+    def __init__(self, min_interval=0.05):
+        self.phases = []
+        self.progress = []
+        self.min_interval = min_interval
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._last_progress = -float('inf')
+
+    # Close the phase that started at the previous mark
+    def mark(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.phases.append({'phase': name, 'wall_s': wall - self._wall, 'cpu_s': cpu - self._cpu})
+        self._wall, self._cpu = wall, cpu
+
+    def _record(self, runtime, **values):
+        self.progress.append({'time_s': runtime, **values})
+
+    # Whether a periodic progress record at `runtime` is due; one per min_interval
+    def due(self, runtime):
+        if runtime - self._last_progress < self.min_interval:
+            return False
+        self._last_progress = runtime
+        return True
+
+    # Whether the solve should stop; overridden where solves can be cancelled (optim.jobs)
+    def cancelled(self):
+        return False
+
+    # Gurobi callback; MIP progress is throttled to one record per min_interval,
+    # new incumbents are always recorded
+    def callback(self, model, where):
+        from gurobipy import GRB
+        if where == GRB.Callback.MIP:
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+            if not self.due(runtime):
+                return
+            self.record_mip(runtime, 'mip', model.cbGet(GRB.Callback.MIP_OBJBST), model.cbGet(GRB.Callback.MIP_OBJBND),
+                            model.cbGet(GRB.Callback.MIP_NODCNT))
+        elif where == GRB.Callback.MIPSOL:
+            self.record_mip(model.cbGet(GRB.Callback.RUNTIME), 'solution', model.cbGet(GRB.Callback.MIPSOL_OBJBST),
+                            model.cbGet(GRB.Callback.MIPSOL_OBJBND), model.cbGet(GRB.Callback.MIPSOL_NODCNT),
+                            solution=model.cbGet(GRB.Callback.MIPSOL_OBJ))
+        elif where == GRB.Callback.SIMPLEX:
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+            if not self.due(runtime):
+                return
+            self._record(runtime, event='simplex', objective=model.cbGet(GRB.Callback.SPX_OBJVAL),
+                         iterations=model.cbGet(GRB.Callback.SPX_ITRCNT))
+
+    # Record one MIP progress point with its gap
+    def record_mip(self, runtime, event, incumbent, bound, nodes, **values):
+        # Solvers report huge values (Gurobi 1e100, HiGHS inf) while there is no incumbent or bound yet
+        incumbent = None if abs(incumbent) >= 1e100 else incumbent
+        bound = None if abs(bound) >= 1e100 else bound
+        gap = None
+        if incumbent is not None and bound is not None:
+            gap = abs(bound - incumbent) / max(abs(incumbent), 1e-10)
+        self._record(runtime, event=event, incumbent=incumbent, bound=bound, nodes=nodes, gap=gap, **values)
+
+    # Callback running the telemetry callback and then `other`
+    def wrap(self, other):
+        def callback(model, where):
+            self.callback(model, where)
+            other(model, where)
+        return callback
+
+    # Structured records, one dict per phase or progress point
+    def records(self):
+        return ([{'type': 'phase', **phase} for phase in self.phases]
+                + [{'type': 'progress', **point} for point in self.progress])
+
+    def to_json_lines(self):
+        return '\n'.join(json.dumps(record) for record in self.records())
+
+    # Emit every record as one JSON log line
+    def log(self, level=logging.INFO):
+        for record in self.records():
+            logger.log(level, json.dumps(record))
+
+# Stand-in used when no telemetry is requested: marks are dropped and no callback is attached
+class _NoTelemetry:
+    callback = None
+
+    def mark(self, name):
+        pass
+
+    def cancelled(self):
+        return False
+
+    def wrap(self, other):
+        return other
+
+NO_TELEMETRY = _NoTelemetry()
@@ -1,156 +1,173 @@
+import hashlib
 import streamlit as st
-import gurobipy as gp
-from gurobipy import GRB
-import pandas as pd
-
-# Function to solve the factory planning optimization problem
-def solve_factory_planning(user_input):
-    # Unpacking user input
-    products = user_input['products']
-    months = user_input['months']
-
-    profit = user_input['profit']
-    max_sales = user_input['max_sales']
-
-    holding_cost = user_input['holding_cost']
-    max_inventory = user_input['max_inventory']
-    store_target = user_input['store_target']
-    hours_per_month = user_input['hours_per_month']
-
-    resources = user_input['resources']
-    resource_cost = user_input['resource_cost']
-    time_req = user_input['time_req']
-    down = user_input['down']
-    installed = user_input['installed']
-
-    raw_materials = user_input['raw_materials']
-    raw_material_availability = user_input['raw_material_availability']
-    raw_material_cost = user_input['raw_material_cost']
-    material_usage = user_input['material_usage']
-
-    # Model Initialization
-    factory = gp.Model('Factory Planning')
-
-    # Decision Variables
-    make = factory.addVars([(month, product) for month in months for product in products], name="Make")
-    store = factory.addVars([(month, product) for month in months for product in products], ub=max_inventory, name="Store")
-    sell = factory.addVars([(month, product) for month in months for product in products], ub=max_sales, name="Sell")
-
-    # Constraints
-    # Initial balance
-    factory.addConstrs(
-        (make[months[0], product] == sell[months[0], product] + store[months[0], product] for product in products),
-        name="Initial_Balance"
-    )
-    # Balance for subsequent months
-    factory.addConstrs(
-        (store[months[months.index(month) - 1], product] + make[month, product] == sell[month, product] + store[month, product]
-         for product in products for month in months if month != months[0]),
-        name="Balance"
-    )
-    # Final inventory targets
-    factory.addConstrs(
-        (store[months[-1], product] == store_target for product in products),
-        name="End_Balance"
-    )
-    # Resource capacity constraints
-    factory.addConstrs(
-        (gp.quicksum(time_req[resource][product] * make[month, product] for product in time_req[resource]) <= 
-         hours_per_month * (installed[resource] - down.get((month, resource), 0))
-         for resource in resources for month in months),
-        name="Capacity"
-    )
-    # Raw material constraints
-    factory.addConstrs(
-        (gp.quicksum(material_usage[material][product] * make[month, product] for product in products for month in months) <= 
-         raw_material_availability[material] for material in raw_materials),
-        name="Raw_Material_Limit"
-    )
-
-    # Objective Function
-    obj = (
-        gp.quicksum(profit[product] * sell[month, product] - holding_cost * store[month, product] for month in months for product in products)
-        - gp.quicksum(resource_cost[resource] * gp.quicksum(time_req[resource][product] * make[month, product] for product in products)
-                      for resource in resources for month in months)
-        - gp.quicksum(raw_material_cost[material] * gp.quicksum(material_usage[material][product] * make[month, product] for product in products for month in months)
-                      for material in raw_materials)
-    )
-    factory.setObjective(obj, GRB.MAXIMIZE)
-
-    # Optimization
-    factory.optimize()
-
-    # Results
-    if factory.status == GRB.OPTIMAL:
-        result = {
-            'profit': factory.objVal,
-            'make_plan': pd.DataFrame(0.0, index=months, columns=products),
-            'sell_plan': pd.DataFrame(0.0, index=months, columns=products),
-            'store_plan': pd.DataFrame(0.0, index=months, columns=products),
-            'raw_material_plan': pd.DataFrame(0.0, index=months, columns=raw_materials)
-        }
+from optim.backends import BACKENDS
+from optim.cache import SolutionCache, instance_hash
+from optim.io import PRODUCTION_TABLES, production_instance, read_tables
+from optim.production import (
+    FactoryPlanningModel, planning_structure, rolling_horizon_gap, run_scenario_sweep, solve_factory_planning,
+    solve_factory_planning_rolling, standard_scenarios
+)
+from optim.jobs import job_telemetry
+from optim.telemetry import Telemetry
+from ui.diagnostics import show_diagnostics
+from ui.jobs import collect_job, job_queue, show_job_outcome, show_job_progress
+
+# Timings of this script run, starting with widget rendering
+telemetry = Telemetry()
 
-        for (month, product), var in make.items():
-            result['make_plan'].loc[month, product] = var.x
+# Function to fetch the session's model, updating it in place when only parameters changed
+def cached_factory_model(user_input, telemetry=None):
+    model = st.session_state.get('factory_model')
+    if model is not None and model.structure == planning_structure(user_input):
+        model.update(user_input, telemetry)
+    else:
+        model = FactoryPlanningModel(user_input, telemetry)
+        st.session_state['factory_model'] = model
+    return model
 
-        for (month, product), var in sell.items():
-            result['sell_plan'].loc[month, product] = var.x
+# Function to open the on-disk solution cache once per server; it is shared by all sessions
+@st.cache_resource
+def solution_cache():
+    return SolutionCache()
 
-        for (month, product), var in store.items():
-            result['store_plan'].loc[month, product] = var.x
+# Function to render the plans of a result
+def show_plans(result):
+    st.subheader("Production Plan")
+    st.dataframe(result['make_plan'])
+    st.subheader("Sales Plan")
+    st.dataframe(result['sell_plan'])
+    st.subheader("Inventory Plan")
+    st.dataframe(result['store_plan'])
+    st.subheader("Raw Material Usage Plan")
+    st.dataframe(result['raw_material_plan'])
+
+# Function to headline a result; rolling-horizon plans are feasible but not proven optimal
+def show_profit(result, rolling):
+    if rolling:
+        st.success(f"Rolling-horizon plan complete! Profit: {result['profit']:.2f} (not proven optimal)")
+    else:
+        st.success(f"Optimization Complete! Maximum Profit: {result['profit']:.2f}")
 
-        for month in months:
-            for material in raw_materials:
-                result['raw_material_plan'].loc[month, material] = sum(
-                    material_usage[material][product] * make[month, product].x for product in products
-                )
+# Function to compare a rolling-horizon plan with the full model, cached by the result's key
+# so reruns of the page do not solve the full model again
+@st.cache_data(show_spinner="Solving the full-horizon model...")
+def cached_rolling_gap(key, _user_input, window, step, backend, _result):
+    return rolling_horizon_gap(_user_input, window, step, backend=backend, rolling=_result)
 
-        return result
+# Function to report how far a rolling-horizon plan falls short of the full model's optimum
+def show_rolling_gap(key, user_input, rolling, result):
+    if not rolling or not rolling['report_gap']:
+        return
+    gap = cached_rolling_gap(key, user_input, rolling['window'], rolling['step'], rolling['backend'], result)
+    if gap:
+        st.info(f"Full-horizon optimum: {gap['full_profit']:.2f} (rolling-horizon gap {100 * gap['gap']:.3f}%)")
     else:
-        return None
+        st.warning("The full-horizon model is too large to solve for comparison.")
+
+# Function to load uploaded instance tables, cached by the content hash of the files
+@st.cache_data(show_spinner="Loading instance...")
+def load_uploaded_instance(digests, _files):
+    return production_instance(read_tables(_files))
 
 # Streamlit App
 st.title("Factory Planning Optimization")
 st.sidebar.header("Configuration")
 
+# Bulk instance upload; the per-value widgets below are skipped when files are supplied
+st.sidebar.subheader("Instance Data")
+uploaded = st.sidebar.file_uploader(
+    f"Upload tables ({', '.join(PRODUCTION_TABLES)}) as CSV or Parquet", type=['csv', 'parquet'],
+    accept_multiple_files=True
+)
+instance = None
+if uploaded:
+    files = {file.name: file.getvalue() for file in uploaded}
+    try:
+        instance = load_uploaded_instance(
+            tuple(sorted((name, hashlib.sha256(data).hexdigest()) for name, data in files.items())), files
+        )
+    except ValueError as error:
+        st.sidebar.error(str(error))
+    else:
+        st.sidebar.success(
+            f"Loaded {len(instance['months'])} months, {len(instance['products'])} products, "
+            f"{len(instance['resources'])} resources and {len(instance['raw_materials'])} raw materials"
+        )
+
 # Sidebar inputs
-st.sidebar.subheader("General Settings")
-month_count = st.sidebar.number_input("Number of Months", min_value=1, max_value=12, step=1, value=1)
-months = [st.sidebar.text_input(f"Name of Month {i + 1}", value=f"Month {i + 1}") for i in range(month_count)]
+if instance is None:
+    st.sidebar.subheader("General Settings")
+    month_count = st.sidebar.number_input("Number of Months", min_value=1, max_value=60, step=1, value=1)
+    months = [st.sidebar.text_input(f"Name of Month {i + 1}", value=f"Month {i + 1}") for i in range(month_count)]
+
+    product_count = st.sidebar.number_input("Number of Products", min_value=1, step=1, value=2)
+    products = [st.sidebar.text_input(f"Product {i + 1} Name", value=f"Product {i + 1}") for i in range(product_count)]
 
-product_count = st.sidebar.number_input("Number of Products", min_value=1, step=1, value=2)
-products = [st.sidebar.text_input(f"Product {i + 1} Name", value=f"Product {i + 1}") for i in range(product_count)]
+    resource_count = st.sidebar.number_input("Number of Resources", min_value=1, step=1, value=2)
+    resources = [st.sidebar.text_input(f"Resource {i + 1} Name", value=f"Resource {i + 1}") for i in range(resource_count)]
 
-resource_count = st.sidebar.number_input("Number of Resources", min_value=1, step=1, value=2)
-resources = [st.sidebar.text_input(f"Resource {i + 1} Name", value=f"Resource {i + 1}") for i in range(resource_count)]
+st.sidebar.subheader("Solver Settings")
+backend = st.sidebar.selectbox("Solver backend", BACKENDS)
+# Background solves run in worker processes and do not block this session, but build a fresh
+# model every time; solving here (the default) keeps the reused, warm-started model
+background = st.sidebar.checkbox("Solve in a background worker", value=False)
+time_limit = st.sidebar.number_input("Time limit (s, 0 = none)", min_value=0.0, value=0.0, step=10.0, disabled=not background)
+# Model reuse and the builder comparison work on Gurobi models in this process only
+reuse_model = st.sidebar.checkbox("Reuse model between solves", value=True, disabled=backend != 'gurobi' or background)
+reuse_model = reuse_model and backend == 'gurobi' and not background
+# Model builder selection; a reused model and uploaded instances (arrays) always go through
+# the matrix builder, so the choice only applies to fresh builds of widget input
+vectorized = st.sidebar.checkbox("Use matrix API builder", value=instance is not None or reuse_model,
+                                 disabled=instance is not None or reuse_model)
+vectorized = vectorized or instance is not None or reuse_model
+cross_check = st.sidebar.checkbox("Compare both builders", value=False, disabled=instance is not None or backend != 'gurobi')
+cross_check = cross_check and instance is None and backend == 'gurobi'
+# Long horizons can be planned window by window, committing the first `step` months of each
+rolling = None
+if st.sidebar.checkbox("Rolling horizon", value=False):
+    window = st.sidebar.number_input("Window (months)", min_value=1, step=1, value=12)
+    step = st.sidebar.number_input("Step (months)", min_value=1, max_value=int(window), step=1,
+                                   value=max(int(window) // 2, 1))
+    report_gap = st.sidebar.checkbox("Report gap against the full model", value=False)
+    rolling = {'window': int(window), 'step': int(step), 'report_gap': report_gap, 'backend': backend}
+use_cache = st.sidebar.checkbox("Reuse stored results of identical instances", value=True)
+mode = st.sidebar.radio("Mode", ["Single solve", "Scenario sweep"])
+diagnostics = st.sidebar.checkbox("Show diagnostics", value=False)
+if mode == "Scenario sweep":
+    demand_changes = st.sidebar.multiselect("Demand changes (%)", [-20, -10, -5, 5, 10, 20], default=[-10, 10])
+    extra_downtime = st.sidebar.checkbox("One extra machine down per month and resource", value=True)
+    shortage = st.sidebar.number_input("Raw material shortage (%)", min_value=0, max_value=100, step=5, value=10)
+    if backend != 'gurobi':
+        st.sidebar.caption("Scenario sweeps update one Gurobi model in place and always use Gurobi.")
 
-# Raw material inputs
-st.sidebar.subheader("Raw Material Settings")
-raw_material_count = st.sidebar.number_input("Number of Raw Materials", min_value=1, step=1, value=3)
-raw_materials = [st.sidebar.text_input(f"Raw Material {i + 1} Name", value=f"Material {i + 1}") for i in range(raw_material_count)]
+if instance is None:
+    # Raw material inputs
+    st.sidebar.subheader("Raw Material Settings")
+    raw_material_count = st.sidebar.number_input("Number of Raw Materials", min_value=1, step=1, value=3)
+    raw_materials = [st.sidebar.text_input(f"Raw Material {i + 1} Name", value=f"Material {i + 1}") for i in range(raw_material_count)]
 
-raw_material_availability = {
-    material: st.sidebar.number_input(f"Available Quantity of {material}", min_value=0, step=1) for material in raw_materials
-}
+    raw_material_availability = {
+        material: st.sidebar.number_input(f"Available Quantity of {material}", min_value=0, step=1) for material in raw_materials
+    }
 
-raw_material_cost = {
-    material: st.sidebar.number_input(f"Cost of {material}", min_value=0.0, step=0.01) for material in raw_materials
-}
+    raw_material_cost = {
+        material: st.sidebar.number_input(f"Cost of {material}", min_value=0.0, step=0.01) for material in raw_materials
+    }
 
-# Main inputs
-st.subheader("Input Product Details")
-profit = {product: st.number_input(f"Profit for {product}", min_value=0, step=1) for product in products}
-max_sales = {(month, product): st.number_input(f"Max Sales of {product} in {month}", min_value=0, step=10) for month in months for product in products}
+    # Main inputs
+    st.subheader("Input Product Details")
+    profit = {product: st.number_input(f"Profit for {product}", min_value=0, step=1) for product in products}
+    max_sales = {(month, product): st.number_input(f"Max Sales of {product} in {month}", min_value=0, step=10) for month in months for product in products}
 
-st.subheader("Input Resource Details")
-resource_cost = {resource: st.number_input(f"Cost of {resource} per hour", min_value=0.0, step=0.1) for resource in resources}
-time_req = {resource: {product: st.number_input(f"Time Required for {product} on {resource}", min_value=0.0, step=0.1) for product in products} for resource in resources}
-down = {(month, resource): st.number_input(f"Number of {resource} Down in {month}", min_value=0, step=1) for month in months for resource in resources}
-installed = {resource: st.number_input(f"Number of Installed {resource}", min_value=1, step=1) for resource in resources}
+    st.subheader("Input Resource Details")
+    resource_cost = {resource: st.number_input(f"Cost of {resource} per hour", min_value=0.0, step=0.1) for resource in resources}
+    time_req = {resource: {product: st.number_input(f"Time Required for {product} on {resource}", min_value=0.0, step=0.1) for product in products} for resource in resources}
+    down = {(month, resource): st.number_input(f"Number of {resource} Down in {month}", min_value=0, step=1) for month in months for resource in resources}
+    installed = {resource: st.number_input(f"Number of Installed {resource}", min_value=1, step=1) for resource in resources}
 
-# Material usage per product
-st.subheader("Input Material Details")
-material_usage = {material: {product: st.number_input(f"{material} Required for {product}", min_value=0.0, step=0.1) for product in products} for material in raw_materials}
+    # Material usage per product
+    st.subheader("Input Material Details")
+    material_usage = {material: {product: st.number_input(f"{material} Required for {product}", min_value=0.0, step=0.1) for product in products} for material in raw_materials}
 
 st.subheader("Cost and Inventory Parameters")
 holding_cost = st.number_input("Holding Cost", min_value=0.0, step=0.01, value=0.5)
@@ -160,37 +177,119 @@ hours_per_month = st.number_input("Hours per Month", min_value=1, step=1, value=
 
 # Optimization
 if st.button("Optimize"):
-    user_input = {
-        'products': products,
-        'profit': profit,
-        'max_sales': max_sales,
-        'resources': resources,
-        'resource_cost': resource_cost,
-        'time_req': time_req,
-        'down': down,
-        'installed': installed,
-        'months': months,
-        'holding_cost': holding_cost,
-        'max_inventory': max_inventory,
-        'store_target': store_target,
-        'hours_per_month': hours_per_month,
-        'raw_materials': raw_materials,
-        'raw_material_availability': raw_material_availability,
-        'raw_material_cost': raw_material_cost,
-        'material_usage': material_usage
-    }
+    telemetry.mark('widgets')
+    if instance is not None:
+        user_input = instance.replace(holding_cost=holding_cost, max_inventory=max_inventory,
+                                      store_target=store_target, hours_per_month=hours_per_month)
+    else:
+        user_input = {
+            'products': products,
+            'profit': profit,
+            'max_sales': max_sales,
+            'resources': resources,
+            'resource_cost': resource_cost,
+            'time_req': time_req,
+            'down': down,
+            'installed': installed,
+            'months': months,
+            'holding_cost': holding_cost,
+            'max_inventory': max_inventory,
+            'store_target': store_target,
+            'hours_per_month': hours_per_month,
+            'raw_materials': raw_materials,
+            'raw_material_availability': raw_material_availability,
+            'raw_material_cost': raw_material_cost,
+            'material_usage': material_usage
+        }
 
-    result = solve_factory_planning(user_input)
+    if mode == "Scenario sweep":
+        scenarios = standard_scenarios(user_input, demand_changes, extra_downtime, shortage)
+        table = run_scenario_sweep(user_input, scenarios)
+        telemetry.mark('sweep')
+        if table is None:
+            st.error("Optimization failed. Please check your inputs.")
+        else:
+            st.success(f"Solved {len(scenarios)} scenarios in {table['Solve Time (s)'].sum():.3f} s")
+            st.dataframe(table)
+        telemetry.mark('render')
+        telemetry.log()
+        if diagnostics:
+            show_diagnostics(telemetry)
+        st.stop()
 
-    if result:
-        st.success(f"Optimization Complete! Maximum Profit: {result['profit']:.2f}")
-        st.subheader("Production Plan")
-        st.dataframe(result['make_plan'])
-        st.subheader("Sales Plan")
-        st.dataframe(result['sell_plan'])
-        st.subheader("Inventory Plan")
-        st.dataframe(result['store_plan'])
-        st.subheader("Raw Material Usage Plan")
-        st.dataframe(result['raw_material_plan'])
+    # Answer from the solution cache, hand the solve to a background worker, or solve here
+    if rolling:
+        key = instance_hash('production', user_input, window=rolling['window'], step=rolling['step'])
+    else:
+        key = instance_hash('production', user_input)
+    result = solution_cache().get(key) if use_cache else None
+    cache_hit = result is not None
+    telemetry.mark('cache')
+    previous = st.session_state.pop('production_job', None)
+    if previous is not None and 'job' not in previous:
+        job_queue().discard(previous['id'])
+    if not cache_hit and background:
+        if rolling:
+            job_id = job_queue().submit('production_rolling', time_limit=time_limit or None, user_input=user_input,
+                                        window=rolling['window'], step=rolling['step'], backend=backend)
+        else:
+            job_id = job_queue().submit('production', time_limit=time_limit or None, user_input=user_input,
+                                        vectorized=True, backend=backend)
+        st.session_state['production_job'] = {'id': job_id, 'key': key, 'user_input': user_input, 'rolling': rolling}
+        telemetry.mark('submit')
+    else:
+        if not cache_hit:
+            if rolling:
+                result = solve_factory_planning_rolling(user_input, rolling['window'], rolling['step'],
+                                                        backend=backend, telemetry=telemetry)
+            elif backend != 'gurobi':
+                result = solve_factory_planning(user_input, telemetry=telemetry, backend=backend)
+            elif reuse_model:
+                result = cached_factory_model(user_input, telemetry).solve(telemetry)
+            else:
+                result = solve_factory_planning(user_input, vectorized=vectorized, telemetry=telemetry)
+            if result is not None and use_cache:
+                solution_cache().put(key, result)
+
+        if result:
+            show_profit(result, rolling)
+            if cache_hit:
+                st.info("Result served from the solution cache.")
+            show_rolling_gap(key, user_input, rolling, result)
+            if cross_check and not rolling:
+                other = solve_factory_planning(user_input, vectorized=not vectorized)
+                if other:
+                    st.info(f"Other builder profit: {other['profit']:.2f} (difference {abs(other['profit'] - result['profit']):.2e})")
+                else:
+                    st.warning("The other builder did not reach an optimal solution.")
+            show_plans(result)
+        else:
+            st.error("Optimization failed. Please check your inputs.")
+        telemetry.mark('render')
+        telemetry.log()
+        if diagnostics:
+            show_diagnostics(telemetry)
+
+# This session's background solve: poll it while it runs, then keep showing its plans
+background_job = st.session_state.get('production_job')
+if background_job is not None and 'job' not in background_job:
+    job = collect_job(background_job['id'])
+    if job is None:
+        show_job_progress(background_job['id'])
     else:
+        background_job['job'] = job
+        # Rolling-horizon plans are never proven optimal, but are complete once the job finished
+        complete = job['optimal'] or background_job['rolling'] and job['status'] == 'finished'
+        if complete and use_cache:
+            solution_cache().put(background_job['key'], job['result'])
+if background_job is not None and 'job' in background_job:
+    job = background_job['job']
+    show_job_outcome(job)
+    if job['result']:
+        show_profit(job['result'], background_job['rolling'])
+        show_rolling_gap(background_job['key'], background_job['user_input'], background_job['rolling'], job['result'])
+        show_plans(job['result'])
+    elif job['status'] == 'finished':
         st.error("Optimization failed. Please check your inputs.")
+    if diagnostics:
+        show_diagnostics(job_telemetry(job))
@@ -1,15 +1,122 @@
+import hashlib
+import io
 import streamlit as st
 import matplotlib.pyplot as plt
-from itertools import product
-from math import sqrt
-import gurobipy as gp
-from gurobipy import GRB
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection
+from optim.backends import BACKENDS
+from optim.cache import SolutionCache, instance_hash
+from optim.capacitated import solve_capacitated_location
+from optim.io import LOCATION_TABLES, location_instance, read_tables
+from optim.jobs import job_telemetry
+from optim.location import FORMULATIONS, pruning_gap, solve_facility_location
+from optim.telemetry import Telemetry
+from ui.diagnostics import show_diagnostics
+from ui.jobs import collect_job, job_queue, show_job_outcome, show_job_progress
 
-# Function to compute the Euclidean distance between two points
-def compute_distance(loc1, loc2):
-    dx = loc1[0] - loc2[0]
-    dy = loc1[1] - loc2[1]
-    return sqrt(dx * dx + dy * dy)
+# Timings of this script run, starting with widget rendering
+telemetry = Telemetry()
+
+# Function to open the on-disk solution cache once per server; it is shared by all sessions
+@st.cache_resource
+def solution_cache():
+    return SolutionCache()
+
+# Function to load uploaded instance tables, cached by the content hash of the files
+@st.cache_data(show_spinner="Loading instance...")
+def load_uploaded_instance(digests, _files):
+    return location_instance(read_tables(_files))
+
+# Routes are labelled with their share of demand only up to this many routes
+ROUTE_LABEL_LIMIT = 50
+# Rows per page of the plan table
+PLAN_PAGE_SIZE = 500
+
+# Function to draw the solution map as PNG bytes: all routes form a single LineCollection.
+# Cached per solution, so reruns of the page show the stored image instead of redrawing.
+@st.cache_data(max_entries=32, show_spinner="Drawing the solution...")
+def solution_plot(solution_key, _customers, _facilities, _build, _shipments):
+    customers, facilities = np.asarray(_customers, dtype=float), np.asarray(_facilities, dtype=float)
+    fig, ax = plt.subplots(figsize=(8, 8))
+
+    # Plot customer, facility and selected facility locations
+    ax.scatter(customers[:, 0], customers[:, 1], color='blue', label="Customers", zorder=5)
+    ax.scatter(facilities[:, 0], facilities[:, 1], color='red', label="Facilities", zorder=5)
+    if len(_build):
+        built = facilities[list(_build)]
+        ax.scatter(built[:, 0], built[:, 1], color='green', label="Built facility", zorder=6, s=100, marker='X')
+
+    # Plot shipment routes; labels only while they stay readable
+    if _shipments:
+        customer, facility, fraction = (np.array(column) for column in zip(*_shipments))
+        starts, ends = customers[customer.astype(int)], facilities[facility.astype(int)]
+        ax.add_collection(LineCollection(np.stack([starts, ends], axis=1), colors='gray', alpha=0.5))
+        if len(_shipments) <= ROUTE_LABEL_LIMIT:
+            for (x, y), share in zip((starts + ends) / 2, np.round(100 * fraction, 2)):
+                ax.text(x, y, f"{share}%", fontsize=10, color="black", ha="center")
+
+    # Add labels and legend
+    ax.set_xlabel("X Coordinate")
+    ax.set_ylabel("Y Coordinate")
+    ax.set_title("Facility Location Problem - Optimization Solution")
+    ax.legend()
+    image = io.BytesIO()
+    fig.savefig(image, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return image.getvalue()
+
+# Function to solve the unpruned model for the pruning gap, cached by the solution's key so
+# reruns and job polls do not solve both models again
+@st.cache_data(max_entries=32, show_spinner="Solving the unpruned model...")
+def cached_pruning_gap(key, _customers, _facilities, _setup_cost, cost_per_mile, k_nearest):
+    return pruning_gap(_customers, _facilities, _setup_cost, cost_per_mile, k_nearest)
+
+# Function to display the build and shipment plans as one table, one page at a time
+def show_plan_table(build, shipments, customer_names, facility_names):
+    st.subheader("Build and Shipment Plan")
+    st.caption(f"Build {len(build)} facilities: "
+               + ", ".join(facility_names[f] for f in build[:20]) + (", ..." if len(build) > 20 else ""))
+    plan = pd.DataFrame(shipments, columns=['customer', 'facility', 'share'])
+    plan = pd.DataFrame({
+        'Facility': np.asarray(facility_names, dtype=object)[plan['facility'].to_numpy(dtype=int)],
+        'Customer': np.asarray(customer_names, dtype=object)[plan['customer'].to_numpy(dtype=int)],
+        'Share of demand (%)': (100 * plan['share']).round(2),
+    }).sort_values(['Facility', 'Customer'], kind='stable', ignore_index=True)
+    pages = max(1, -(-len(plan) // PLAN_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+    st.dataframe(plan.iloc[(page - 1) * PLAN_PAGE_SIZE:page * PLAN_PAGE_SIZE], hide_index=True)
+
+# Function to display a solution: build and shipment plans and a map. `view` holds the
+# instance data and display options the solve was submitted with.
+def show_solution(result, view):
+    if not result:
+        st.error("No optimal solution found!")
+        return
+    customers, facilities = view['customers'], view['facilities']
+    customer_names, facility_names = view['customer_names'], view['facility_names']
+    k_nearest = view['k_nearest']
+    # Results cached before solvers reported optimality were all optimal
+    headline = "Optimal solution found" if result.get('optimal', True) else "Best solution found"
+    st.success(f"{headline} with total cost of {result['cost']:.2f} million GBP")
+    build, shipments = result['build'], result['shipments']
+    if view['capacitated']:
+        st.info(f"Lower bound {result['lower_bound']:.2f}, heuristic start {result['heuristic_cost']:.2f}")
+        # Show every period's facilities and plot the last period
+        for t, period_build in enumerate(build):
+            st.write(f"Period {t + 1}: operate {', '.join(facility_names[f] for f in period_build)}.")
+        build, shipments = build[-1], shipments[-1]
+    if k_nearest and view['report_gap'] and not view['capacitated']:
+        gap = cached_pruning_gap(view['key'], customers, facilities, view['setup_cost'], view['cost_per_mile'],
+                                 k_nearest)
+        if gap:
+            st.info(f"Unpruned optimum: {gap['full_cost']:.2f} million GBP (pruning gap {100 * gap['gap']:.2f}%)")
+        else:
+            st.warning("The unpruned model is too large to solve for comparison.")
+
+    show_plan_table(build, shipments, customer_names, facility_names)
+    drawing = {'customers': customers, 'facilities': facilities, 'build': build, 'shipments': shipments}
+    st.image(solution_plot(instance_hash('plot', drawing), customers, facilities, build, shipments))
 
 # Streamlit app layout
 st.title("Facility Location Problem Optimizer")
@@ -24,123 +131,182 @@ with st.sidebar:
     st.markdown("""
     Use the sidebar to adjust the key settings for customers and facilities.
     """)
+    # Bulk instance upload; the per-customer and per-facility widgets are skipped when files are supplied
+    uploaded = st.file_uploader(
+        f"Upload tables ({', '.join(LOCATION_TABLES)}) as CSV or Parquet", type=['csv', 'parquet'],
+        accept_multiple_files=True
+    )
+    instance = None
+    if uploaded:
+        files = {file.name: file.getvalue() for file in uploaded}
+        try:
+            instance = load_uploaded_instance(
+                tuple(sorted((name, hashlib.sha256(data).hexdigest()) for name, data in files.items())), files
+            )
+        except ValueError as error:
+            st.error(str(error))
+
     # Number of customers and facilities
-    num_customers = st.slider("Number of customers", min_value=1, max_value=20, value=2)
-    num_facilities = st.slider("Number of facilities", min_value=1, max_value=20, value=5)
+    if instance is None:
+        num_customers = st.slider("Number of customers", min_value=1, max_value=20, value=2)
+        num_facilities = st.slider("Number of facilities", min_value=1, max_value=20, value=5)
+    else:
+        num_customers, num_facilities = len(instance['customers']), len(instance['facilities'])
+        st.success(f"Loaded {num_customers} customers and {num_facilities} facilities")
     cost_per_mile = st.number_input("Cost per mile (in millions GBP)", value=1.0, format="%.2f")
+    k_nearest = st.number_input("Nearest facilities per customer (0 = all)", min_value=0, max_value=num_facilities, value=0, step=1)
+    backend = st.selectbox("Solver backend", BACKENDS)
+    # Benders cuts and the capacitated engine rely on Gurobi callbacks and MIP starts
+    formulation = st.selectbox("Linking formulation",
+                               FORMULATIONS if backend == 'gurobi' else [f for f in FORMULATIONS if f != 'benders'])
+    report_gap = st.checkbox("Report gap against the unpruned model", value=False, disabled=k_nearest == 0)
+    capacitated = st.checkbox("Capacitated facilities with customer demand", value=False, disabled=backend != 'gurobi')
+    capacitated = capacitated and backend == 'gurobi'
+    if capacitated:
+        num_periods = st.number_input("Number of periods", min_value=1, max_value=12, value=1, step=1)
+        demand_growth = st.number_input("Demand growth per period (%)", value=0.0, step=1.0)
+    # Background solves run in worker processes and do not block this session
+    background = st.checkbox("Solve in a background worker", value=True)
+    time_limit = st.number_input("Time limit (s, 0 = none)", min_value=0.0, value=0.0, step=10.0, disabled=not background)
+    use_cache = st.checkbox("Reuse stored results", value=True,
+                            help="Identical instances are answered from the solution cache, and the last plan for "
+                                 "the same candidate facilities is used as a MIP start.")
+    diagnostics = st.checkbox("Show diagnostics", value=False)
 
-st.header("Customer and Facility Information")
-st.markdown("""
-Enter the details for each customer and facility below, including names, locations, and setup costs.
-""")
+if instance is not None:
+    customer_names, customers = instance['customer_names'], instance['customers']
+    facility_names, facilities, setup_cost = instance['facility_names'], instance['facilities'], instance['setup_cost']
+    demand, capacity = instance.get('demand'), instance.get('capacity')
+    if capacitated and (demand is None or capacity is None):
+        st.error("The capacitated model needs a demand column for customers and a capacity column for facilities.")
+        st.stop()
+else:
+    st.header("Customer and Facility Information")
+    st.markdown("""
+    Enter the details for each customer and facility below, including names, locations, and setup costs.
+    """)
+
+    # Input for customer details
+    with st.expander("Customer Locations and Names"):
+        st.markdown("Enter the coordinates and names for each customer.")
+        customer_names = []
+        customers = []
+        demand = []
+        for i in range(num_customers):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                name = st.text_input(f"Name for Customer {i+1}", f"Customer {i+1}")
+            with col2:
+                x = st.number_input(f"X-coordinate for Customer {i+1}", value=0.0, key=f"cust_x_{i}")
+            with col3:
+                y = st.number_input(f"Y-coordinate for Customer {i+1}", value=0.0, key=f"cust_y_{i}")
+            with col4:
+                if capacitated:
+                    demand.append(st.number_input(f"Demand of Customer {i+1}", min_value=0.0, value=1.0, key=f"demand_{i}"))
+            customer_names.append(name)
+            customers.append((x, y))
 
-# Input for customer details
-with st.expander("Customer Locations and Names"):
-    st.markdown("Enter the coordinates and names for each customer.")
-    customer_names = []
-    customers = []
-    for i in range(num_customers):
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            name = st.text_input(f"Name for Customer {i+1}", f"Customer {i+1}")
-        with col2:
-            x = st.number_input(f"X-coordinate for Customer {i+1}", value=0.0, key=f"cust_x_{i}")
-        with col3:
-            y = st.number_input(f"Y-coordinate for Customer {i+1}", value=0.0, key=f"cust_y_{i}")
-        customer_names.append(name)
-        customers.append((x, y))
-
-# Input for facility details
-with st.expander("Facility Locations, Names, and Costs"):
-    st.markdown("Enter the coordinates, names, and setup costs for each facility.")
-    facility_names = []
-    facilities = []
-    setup_cost = []
-    for i in range(num_facilities):
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            name = st.text_input(f"Name for Facility {i+1}", f"Facility {i+1}", key=f"fac_name_{i}")
-        with col2:
-            x = st.number_input(f"X-coordinate for Facility {i+1}", value=0.0, key=f"fac_x_{i}")
-        with col3:
-            y = st.number_input(f"Y-coordinate for Facility {i+1}", value=0.0, key=f"fac_y_{i}")
-        with col4:
-            cost = st.number_input(f"Setup cost for Facility {i+1}", value=1.0, key=f"setup_{i}", format="%.2f")
-        facility_names.append(name)
-        facilities.append((x, y))
-        setup_cost.append(cost)
+    # Input for facility details
+    with st.expander("Facility Locations, Names, and Costs"):
+        st.markdown("Enter the coordinates, names, and setup costs for each facility.")
+        facility_names = []
+        facilities = []
+        setup_cost = []
+        capacity = []
+        for i in range(num_facilities):
+            col1, col2, col3, col4, col5 = st.columns(5)
+            with col1:
+                name = st.text_input(f"Name for Facility {i+1}", f"Facility {i+1}", key=f"fac_name_{i}")
+            with col2:
+                x = st.number_input(f"X-coordinate for Facility {i+1}", value=0.0, key=f"fac_x_{i}")
+            with col3:
+                y = st.number_input(f"Y-coordinate for Facility {i+1}", value=0.0, key=f"fac_y_{i}")
+            with col4:
+                cost = st.number_input(f"Setup cost for Facility {i+1}", value=1.0, key=f"setup_{i}", format="%.2f")
+            with col5:
+                if capacitated:
+                    capacity.append(st.number_input(f"Capacity of Facility {i+1}", min_value=0.0, value=10.0, key=f"capacity_{i}"))
+            facility_names.append(name)
+            facilities.append((x, y))
+            setup_cost.append(cost)
 
 # Run optimization button
 if st.button("Run Optimization"):
-    # Solve the optimization problem
-    cartesian_prod = list(product(range(num_customers), range(num_facilities)))
-
-    # Compute shipping costs
-    shipping_cost = {(c, f): cost_per_mile * compute_distance(customers[c], facilities[f]) for c, f in cartesian_prod}
-
-    # Create the optimization model
-    m = gp.Model('facility_location')
-
-    # Decision variables
-    select = m.addVars(num_facilities, vtype=GRB.BINARY, name='Select')
-    assign = m.addVars(cartesian_prod, ub=1, vtype=GRB.CONTINUOUS, name='Assign')
-
-    # Constraints
-    m.addConstrs((assign[(c, f)] <= select[f] for c, f in cartesian_prod), name='Setup2ship')
-    m.addConstrs((gp.quicksum(assign[(c, f)] for f in range(num_facilities)) == 1 for c in range(num_customers)), name='Demand')
-
-    # Objective function
-    m.setObjective(select.prod(setup_cost) + assign.prod(shipping_cost), GRB.MINIMIZE)
-
-    # Optimize the model
-    m.optimize()
-
-    # Display results
-    if m.status == GRB.OPTIMAL:
-        st.success(f"Optimal solution found with total cost of {m.objVal:.2f} million GBP")
-
-        # Display the facility build plan
-        st.subheader("Facility Build Plan")
-        facility_locations = []
-        for facility in select.keys():
-            if abs(select[facility].x) > 1e-6:
-                facility_locations.append(facilities[facility])
-                st.write(f"Build {facility_names[facility]}.")
-
-        # Display the shipment plan
-        st.subheader("Shipment Plan")
-        shipment_plan = []
-        for customer, facility in assign.keys():
-            if abs(assign[customer, facility].x) > 1e-6:
-                shipment_plan.append((customers[customer], facilities[facility], round(100 * assign[customer, facility].x, 2)))
-                st.write(f"{customer_names[customer]} receives {round(100 * assign[customer, facility].x, 2)}% of its demand from {facility_names[facility]}.")
-
-        # Create a plot to visualize the solution
-        fig, ax = plt.subplots(figsize=(8, 8))
-
-        # Plot customer locations
-        customer_x, customer_y = zip(*customers)
-        ax.scatter(customer_x, customer_y, color='blue', label="Customers", zorder=5)
-
-        # Plot facility locations
-        facility_x, facility_y = zip(*facilities)
-        ax.scatter(facility_x, facility_y, color='red', label="Facilities", zorder=5)
-
-        # Plot selected facility locations
-        if facility_locations:
-            selected_x, selected_y = zip(*facility_locations)
-            ax.scatter(selected_x, selected_y, color='green', label="Built facility", zorder=6, s=100, marker='X')
-
-        # Plot shipment routes
-        for (cust, fac, perc) in shipment_plan:
-            ax.plot([cust[0], fac[0]], [cust[1], fac[1]], color='gray', alpha=0.5)  # Gray lines for shipment paths
-            ax.text((cust[0] + fac[0]) / 2, (cust[1] + fac[1]) / 2, f"{perc}%", fontsize=10, color="black", ha="center")
-
-        # Add labels and legend
-        ax.set_xlabel("X Coordinate")
-        ax.set_ylabel("Y Coordinate")
-        ax.set_title("Facility Location Problem - Optimization Solution")
-        ax.legend()
-        st.pyplot(fig)
+    telemetry.mark('widgets')
+    # Everything needed to display the solution later, even after widgets changed
+    view = {
+        'customers': customers, 'facilities': facilities, 'setup_cost': setup_cost, 'cost_per_mile': cost_per_mile,
+        'customer_names': customer_names, 'facility_names': facility_names, 'capacitated': capacitated,
+        'k_nearest': k_nearest, 'report_gap': report_gap,
+    }
+    arguments = {'customers': customers, 'facilities': facilities, 'setup_cost': setup_cost,
+                 'cost_per_mile': cost_per_mile, 'k_nearest': k_nearest or None}
+    fields = {'customers': customers, 'facilities': facilities, 'setup_cost': setup_cost}
+    if capacitated:
+        growth = (1 + demand_growth / 100) ** np.arange(num_periods)
+        fields.update(demand=np.outer(growth, demand), capacity=capacity)
+        arguments.update(demand=fields['demand'], capacity=capacity)
+        kind = 'capacitated'
     else:
-        st.error("No optimal solution found!")
+        arguments.update(formulation=formulation, backend=backend)
+        kind = 'location'
+    key = view['key'] = instance_hash(kind, fields, cost_per_mile=cost_per_mile, k_nearest=k_nearest or None)
+    family = instance_hash(f'{kind}-family', facilities)
+
+    # Answer from the solution cache, hand the solve to a background worker, or solve here.
+    # The last plan for the same candidate facilities becomes the MIP start.
+    result = solution_cache().get(key) if use_cache else None
+    cache_hit = result is not None
+    if not cache_hit and use_cache and not capacitated:
+        previous = solution_cache().latest(family)
+        arguments['start'] = previous and previous['build']
+    telemetry.mark('cache')
+    previous_job = st.session_state.pop('location_job', None)
+    if previous_job is not None and 'job' not in previous_job:
+        job_queue().discard(previous_job['id'])
+    st.session_state.pop('location_solution', None)
+    if not cache_hit and background:
+        job_id = job_queue().submit(kind, time_limit=time_limit or None, **arguments)
+        st.session_state['location_job'] = {'id': job_id, 'key': key, 'family': family, 'view': view}
+        telemetry.mark('submit')
+    else:
+        if not cache_hit:
+            solve = solve_capacitated_location if capacitated else solve_facility_location
+            result = solve(**arguments, telemetry=telemetry)
+            if result is not None and result['optimal'] and use_cache:
+                solution_cache().put(key, result, family)
+        st.session_state['location_solution'] = {
+            'result': result, 'view': view, 'cache_hit': cache_hit, 'telemetry': telemetry,
+        }
+
+# This session's in-process solve, kept so that widget changes (such as the plan table's
+# page) rerun the script without losing it
+solution = st.session_state.get('location_solution')
+if solution is not None:
+    if solution['cache_hit']:
+        st.info("Result served from the solution cache.")
+    show_solution(solution['result'], solution['view'])
+    # Timings are logged once, in the run that solved
+    if solution['telemetry'] is telemetry:
+        telemetry.mark('render')
+        telemetry.log()
+    if diagnostics:
+        show_diagnostics(solution['telemetry'])
+
+# This session's background solve: poll it while it runs, then keep showing its solution
+background_job = st.session_state.get('location_job')
+if background_job is not None and 'job' not in background_job:
+    job = collect_job(background_job['id'])
+    if job is None:
+        show_job_progress(background_job['id'])
+    else:
+        background_job['job'] = job
+        if job['optimal'] and use_cache:
+            solution_cache().put(background_job['key'], job['result'], background_job['family'])
+if background_job is not None and 'job' in background_job:
+    job = background_job['job']
+    show_job_outcome(job)
+    if job['result'] is not None or job['status'] == 'finished':
+        show_solution(job['result'], background_job['view'])
+    if diagnostics:
+        show_diagnostics(job_telemetry(job))
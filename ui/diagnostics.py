@@ -0,0 +1,26 @@
+import pandas as pd
+import streamlit as st
+
+# Function to render a Telemetry: per-phase wall/CPU time, solver progress and a JSON lines export
+def show_diagnostics(telemetry):
+    with st.expander("Diagnostics", expanded=True):
+        st.markdown("**Phase timings**")
+        phases = pd.DataFrame(telemetry.phases, columns=['phase', 'wall_s', 'cpu_s'])
+        st.dataframe(phases)
+        st.bar_chart(phases.groupby('phase', sort=False)[['wall_s', 'cpu_s']].sum())
+
+        progress = pd.DataFrame(telemetry.progress)
+        if not progress.empty:
+            mip = progress[progress['event'] != 'simplex']
+            if not mip.empty:
+                st.markdown("**Incumbent and bound**")
+                st.line_chart(mip.set_index('time_s')[['incumbent', 'bound']])
+                st.markdown("**MIP gap**")
+                st.line_chart(mip.set_index('time_s')['gap'])
+                st.caption(f"{int(mip['nodes'].max())} nodes explored")
+            else:
+                st.markdown("**Simplex objective**")
+                st.line_chart(progress.set_index('time_s')['objective'])
+                st.caption(f"{int(progress['iterations'].max())} simplex iterations")
+
+        st.download_button("Download telemetry (JSON lines)", telemetry.to_json_lines(), file_name="telemetry.jsonl")
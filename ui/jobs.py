@@ -0,0 +1,48 @@
+import pandas as pd
+import streamlit as st
+from optim.jobs import ACTIVE, JobQueue
+
+# Function to start the background job queue once per server; it is shared by all sessions
+@st.cache_resource
+def job_queue():
+    return JobQueue(workers=2)
+
+# Function to render a running job, polled every second: status, incumbent, gap, the
+# incumbent history and a cancel button. The whole page reruns once the job has ended.
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id):
+    job = job_queue().status(job_id)
+    if job['status'] not in ACTIVE:
+        st.rerun()
+
+    status, elapsed, incumbent, gap = st.columns(4)
+    status.metric("Job", job['status'].capitalize())
+    elapsed.metric("Elapsed (s)", "-" if job['elapsed'] is None else f"{job['elapsed']:.1f}")
+    incumbent.metric("Incumbent", "-" if job['incumbent'] is None else f"{job['incumbent']:.2f}")
+    gap.metric("Gap", "-" if job['gap'] is None else f"{100 * job['gap']:.2f}%")
+
+    progress = pd.DataFrame(job['progress'])
+    if not progress.empty and 'incumbent' in progress:
+        st.line_chart(progress.dropna(subset=['incumbent']).set_index('time_s')[['incumbent', 'bound']])
+    if st.button("Cancel", key=f"cancel_{job_id}"):
+        job_queue().cancel(job_id)
+
+# Function to take a session's job once it has ended: the final snapshot is returned and the
+# queue forgets it, so the page keeps the snapshot in session_state. Returns None while active.
+def collect_job(job_id):
+    job = job_queue().status(job_id)
+    if job['status'] in ACTIVE:
+        return None
+    job_queue().forget(job_id)
+    return job
+
+# Function to describe how a job ended above its result
+def show_job_outcome(job):
+    if job['status'] == 'failed':
+        st.error(f"The solve failed: {job['error']}")
+    elif job['status'] == 'cancelled':
+        st.warning("The solve was cancelled" + (", showing the best solution found." if job['result'] else "."))
+    # Rolling-horizon plans are not proven optimal even when they ran to completion
+    elif job['result'] is not None and not job['optimal'] and job['kind'] != 'production_rolling':
+        st.warning(f"Time limit of {job['time_limit']:g} s reached, showing the best solution found"
+                   + ("." if job['gap'] is None else f" (gap {100 * job['gap']:.2f}%)."))